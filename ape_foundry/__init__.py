@@ -59,7 +59,12 @@ def providers():
 
 
 def __getattr__(name: str):
-    if name == "FoundryForkProvider":
+    if name == "FoundryBatchError":
+        from ape_foundry.exceptions import FoundryBatchError
+
+        return FoundryBatchError
+
+    elif name == "FoundryForkProvider":
         from ape_foundry.provider import FoundryForkProvider
 
         return FoundryForkProvider
@@ -84,14 +89,21 @@ def __getattr__(name: str):
 
         return FoundrySubprocessError
 
+    elif name == "TraceDetail":
+        from ape_foundry.trace import TraceDetail
+
+        return TraceDetail
+
     else:
         raise AttributeError(name)
 
 
 __all__ = [
+    "FoundryBatchError",
     "FoundryForkProvider",
     "FoundryNetworkConfig",
     "FoundryProvider",
     "FoundryProviderError",
     "FoundrySubprocessError",
+    "TraceDetail",
 ]
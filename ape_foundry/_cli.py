@@ -0,0 +1,49 @@
+import click
+from ape.cli import ape_cli_context, network_option
+
+
+def _foundry_network_option():
+    return network_option(default="ethereum:local:foundry", provider="foundry")
+
+
+def _validate_provider(cli_ctx, provider):
+    from ape_foundry.provider import FoundryProvider
+
+    if not isinstance(provider, FoundryProvider):
+        cli_ctx.abort(f"Provider '{provider.name}' is not a Foundry provider.")
+
+
+@click.group(short_help="Manage Anvil daemons")
+def cli():
+    """
+    Manage long-lived Anvil processes that Foundry providers attach to,
+    rather than starting a new process each session.
+    """
+
+
+@cli.command(short_help="Start an Anvil daemon")
+@ape_cli_context()
+@_foundry_network_option()
+def start(cli_ctx, provider):
+    """
+    Start an Anvil daemon using the given network's Foundry config.
+    Sessions using the same config attach to it until it is stopped.
+    """
+    _validate_provider(cli_ctx, provider)
+    for daemon in provider.start_daemon():
+        cli_ctx.logger.success(f"Anvil daemon (PID={daemon.pid}) running at '{daemon.uri}'.")
+
+
+@cli.command(short_help="Stop Anvil daemons")
+@ape_cli_context()
+@_foundry_network_option()
+def stop(cli_ctx, provider):
+    """
+    Stop the Anvil daemon(s) for the given network's Foundry config.
+    """
+    _validate_provider(cli_ctx, provider)
+    if not (daemons := provider.stop_daemon()):
+        cli_ctx.logger.info("No Anvil daemons running.")
+
+    for daemon in daemons:
+        cli_ctx.logger.success(f"Stopped Anvil daemon (PID={daemon.pid}) at '{daemon.uri}'.")
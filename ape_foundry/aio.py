@@ -0,0 +1,225 @@
+import asyncio
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from aiohttp import ClientTimeout
+from ape.exceptions import APINotImplementedError
+from eth_utils import to_hex
+from hexbytes import HexBytes
+from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3.types import RPCEndpoint
+
+from ape_foundry.exceptions import FoundryProviderError
+from ape_foundry.trace import AnvilTransactionTrace
+from ape_foundry.utils import convert_code, get_storage_params, to_quantity
+from ape_foundry.ws import AnvilWebSocketProvider, Subscription
+
+if TYPE_CHECKING:
+    from ape.types import AddressType, BlockID, ContractCode, SnapshotID
+
+    from ape_foundry.provider import FoundryProvider
+
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+class AsyncFoundryClient:
+    """
+    Awaitable counterparts of :class:`~ape_foundry.provider.FoundryProvider` methods,
+    for keeping many requests in flight against the provider's Anvil node, such as
+    when fetching balances or traces for many addresses with ``asyncio.gather()``.
+
+    The client does not manage a process; it talks to the node of its provider, so
+    connect and disconnect via the provider. Get one using
+    :attr:`~ape_foundry.provider.FoundryProvider.async_client` and close it when
+    done, e.g. using ``async with``.
+
+    With the ``"ws"`` transport, all requests are pipelined over one WebSocket
+    connection, which also carries subscriptions (see
+    :meth:`~ape_foundry.aio.AsyncFoundryClient.subscribe_blocks` and
+    :meth:`~ape_foundry.aio.AsyncFoundryClient.subscribe_logs`).
+
+    Args:
+        provider (:class:`~ape_foundry.provider.FoundryProvider`): The connected provider.
+        max_concurrency (int): The maximum number of requests in flight at once.
+        transport (Optional[str]): ``"http"`` or ``"ws"``. Defaults to ``"ws"`` when
+          the provider's ``transport`` config is ``"ws"``, else ``"http"``.
+    """
+
+    def __init__(
+        self,
+        provider: "FoundryProvider",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        transport: Optional[str] = None,
+    ):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.transport = transport or ("ws" if provider.settings.transport == "ws" else "http")
+
+        # NOTE: Anvil serves HTTP and WebSockets regardless of the provider's transport.
+        web3_provider: Union[AsyncHTTPProvider, AnvilWebSocketProvider]
+        if self.transport == "ws":
+            web3_provider = AnvilWebSocketProvider(
+                provider.ws_uri, request_timeout=provider.timeout
+            )
+        elif self.transport == "http":
+            web3_provider = AsyncHTTPProvider(
+                provider.uri, request_kwargs={"timeout": ClientTimeout(total=provider.timeout)}
+            )
+        else:
+            raise ValueError(f"Unsupported async transport '{self.transport}'.")
+
+        self.web3 = AsyncWeb3(web3_provider)
+
+    async def __aenter__(self) -> "AsyncFoundryClient":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the client's connections.
+        """
+        if disconnect := getattr(self.web3.provider, "disconnect", None):
+            await disconnect()
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # NOTE: Created lazily so it belongs to the running event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self._semaphore
+
+    async def make_request(self, rpc: str, parameters: Optional[Iterable] = None) -> Any:
+        async with self.semaphore:
+            result = await self.web3.provider.make_request(RPCEndpoint(rpc), list(parameters or []))
+
+        if "error" in result:
+            error = result["error"]
+            message = (
+                error["message"] if isinstance(error, dict) and "message" in error else str(error)
+            )
+            if "not found" in message.lower() and "method" in message.lower():
+                raise APINotImplementedError(
+                    f"RPC method '{rpc}' is not implemented by this node instance."
+                )
+
+            raise FoundryProviderError(message)
+
+        return result.get("result")
+
+    async def subscribe(self, subscription_type: str, *params: Any) -> Subscription:
+        """
+        Subscribe via ``eth_subscribe``, to iterate over notifications as they are
+        pushed rather than polling. Requires the ``"ws"`` transport.
+
+        Usage example::
+
+            async with await client.subscribe_blocks() as blocks:
+                async for header in blocks:
+                    ...
+
+        Args:
+            subscription_type (str): E.g. ``"newHeads"`` or ``"logs"``.
+            *params: Additional parameters, such as a logs filter.
+
+        Returns:
+            :class:`~ape_foundry.ws.Subscription`
+        """
+        if not isinstance(self.web3.provider, AnvilWebSocketProvider):
+            raise FoundryProviderError("Subscriptions require the 'ws' transport.")
+
+        return await self.web3.provider.subscribe(subscription_type, *params)
+
+    async def subscribe_blocks(self) -> Subscription:
+        """
+        Subscribe to new block headers as they are mined.
+        """
+        return await self.subscribe("newHeads")
+
+    async def subscribe_logs(
+        self,
+        address: Optional[Union["AddressType", list["AddressType"]]] = None,
+        topics: Optional[list] = None,
+    ) -> Subscription:
+        """
+        Subscribe to new logs as they are emitted, optionally filtered
+        by address and topics (like ``eth_getLogs``).
+        """
+        log_filter: dict = {}
+        if address is not None:
+            log_filter["address"] = address
+
+        if topics is not None:
+            log_filter["topics"] = topics
+
+        return await self.subscribe("logs", log_filter)
+
+    async def get_balance(
+        self, address: "AddressType", block_id: Optional["BlockID"] = None
+    ) -> int:
+        params = [address, _to_block_param(block_id)]
+        if result := await self.make_request("eth_getBalance", params):
+            return int(result, 16) if isinstance(result, str) else result
+
+        raise FoundryProviderError(f"Failed to get balance for account '{address}'.")
+
+    async def get_code(
+        self, address: "AddressType", block_id: Optional["BlockID"] = None
+    ) -> HexBytes:
+        params = [address, _to_block_param(block_id)]
+        return HexBytes(await self.make_request("eth_getCode", params))
+
+    async def get_transaction_trace(self, transaction_hash: str, **kwargs) -> AnvilTransactionTrace:
+        """
+        Get a transaction's trace, with its ``trace_transaction`` data already
+        fetched so that reading its call tree makes no further requests.
+        """
+        data = await self.make_request("trace_transaction", [transaction_hash])
+        trace = AnvilTransactionTrace(transaction_hash=transaction_hash, **kwargs)
+        trace._trace_data = data
+        trace._set_cached_data("trace_transaction", data)
+        return trace
+
+    async def snapshot(self) -> str:
+        return await self.make_request("evm_snapshot", [])
+
+    async def restore(self, snapshot_id: "SnapshotID") -> bool:
+        snapshot_id = to_hex(snapshot_id) if isinstance(snapshot_id, int) else snapshot_id
+        return await self.make_request("evm_revert", [snapshot_id]) is True
+
+    async def mine(self, num_blocks: int = 1):
+        await self.make_request("anvil_mine", [to_quantity(num_blocks)])
+
+    async def set_balance(self, account: "AddressType", amount: Union[int, float, str, bytes]):
+        amount_hex_str = self.provider._convert_balance(amount)
+        await self.make_request("anvil_setBalance", [account, amount_hex_str])
+
+    async def set_timestamp(self, new_timestamp: int):
+        await self.make_request("evm_setNextBlockTimestamp", [new_timestamp])
+
+    async def set_code(self, address: "AddressType", code: "ContractCode") -> bool:
+        await self.make_request("anvil_setCode", [address, convert_code(code)])
+        return True
+
+    async def set_storage(self, address: "AddressType", slot: int, value: HexBytes):
+        await self.make_request("anvil_setStorageAt", get_storage_params(address, slot, value))
+
+    async def unlock_account(self, address: "AddressType") -> bool:
+        await self.make_request("anvil_impersonateAccount", [address])
+        return True
+
+    async def relock_account(self, address: "AddressType"):
+        await self.make_request("anvil_stopImpersonatingAccount", [address])
+
+
+def _to_block_param(block_id: Optional["BlockID"]) -> Any:
+    if block_id is None:
+        return "latest"
+
+    elif isinstance(block_id, int):
+        return to_hex(block_id)
+
+    return block_id
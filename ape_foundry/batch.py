@@ -0,0 +1,88 @@
+from collections.abc import Callable, Sequence
+from itertools import zip_longest
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from ape_foundry.exceptions import FoundryBatchError
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class BatchRequest(BaseModel):
+    """
+    A request queued in a :class:`~ape_foundry.batch.RequestBatch`.
+    Its ``result`` or ``error`` is set once the batch is sent.
+    """
+
+    index: int
+    """The position of the request in the batch, in the order queued."""
+
+    method: str
+    params: list
+    result: Any = None
+    error: Optional[Any] = None
+
+    @property
+    def error_message(self) -> str:
+        if isinstance(self.error, dict):
+            return str(self.error.get("message", self.error))
+
+        return str(self.error)
+
+
+class RequestBatch:
+    """
+    Requests queued to be sent together as JSON-RPC batches, rather than in a round
+    trip each. Use via :meth:`~ape_foundry.provider.FoundryProvider.batch_requests`.
+
+    Args:
+        send (Callable): Sends a list of ``(method, params)`` and returns the
+          responses in the same order.
+        size (int): The maximum number of requests per batch.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[list[tuple[str, list]]], Sequence[dict]],
+        size: int = DEFAULT_BATCH_SIZE,
+    ):
+        if size < 1:
+            raise ValueError("Batch size must be at least 1.")
+
+        self.send = send
+        self.size = size
+        self.requests: list[BatchRequest] = []
+        self.pending: list[BatchRequest] = []
+
+    def add(self, method: str, params: list) -> BatchRequest:
+        request = BatchRequest(index=len(self.requests), method=method, params=params)
+        self.requests.append(request)
+        self.pending.append(request)
+        return request
+
+    def flush(self):
+        """
+        Send all pending requests, in chunks of up to ``size`` requests.
+
+        Raises:
+            :class:`~ape_foundry.exceptions.FoundryBatchError`: When any request
+              failed, mapping each error to its originating request.
+        """
+        failed = []
+        size = self.size
+        while self.pending:
+            chunk, self.pending = self.pending[:size], self.pending[size:]
+            responses = list(self.send([(r.method, r.params) for r in chunk]))
+            for request, response in zip_longest(chunk, responses[: len(chunk)]):
+                if response is None:
+                    request.error = "Missing response."
+                    failed.append(request)
+                elif "error" in response:
+                    request.error = response["error"]
+                    failed.append(request)
+                else:
+                    request.result = response.get("result")
+
+        if failed:
+            raise FoundryBatchError(failed)
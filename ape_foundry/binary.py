@@ -0,0 +1,82 @@
+import os
+import re
+import shutil
+from pathlib import Path
+from subprocess import PIPE, run
+
+from pydantic import BaseModel
+
+from ape_foundry.cache import JSONCache
+from ape_foundry.exceptions import FoundryNotInstalledError, FoundrySubprocessError
+
+FLAG_PATTERN = re.compile(r"(?<![\w-])--[a-z][a-z0-9-]*")
+
+
+class AnvilBinary(BaseModel):
+    """
+    The resolved Anvil executable, along with its version and supported CLI flags.
+    Resolving it requires running the executable, so the result is cached on disk,
+    keyed by the executable's path, modification time and size.
+    """
+
+    path: str
+    version: str
+    flags: list[str] = []
+    mtime_ns: int
+    size: int
+
+    @classmethod
+    def resolve(cls, cache_path: Path) -> "AnvilBinary":
+        """
+        Find the Anvil executable on the ``PATH``, only running it
+        when there is no valid cache entry for it.
+
+        Args:
+            cache_path (Path): The JSON file caching previous results.
+
+        Returns:
+            :class:`~ape_foundry.binary.AnvilBinary`
+        """
+        if not (path := shutil.which("anvil")):
+            raise FoundryNotInstalledError()
+
+        stat = os.stat(path)
+        cache = JSONCache(cache_path)
+        if (cached := cache.get(path)) is not None:
+            try:
+                binary = cls.model_validate(cached)
+            except ValueError:
+                binary = None
+
+            if binary is not None and (binary.mtime_ns, binary.size) == (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                return binary
+
+        binary = cls(
+            path=path,
+            version=_run(path, "--version"),
+            flags=sorted(set(FLAG_PATTERN.findall(_run(path, "--help")))),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+        )
+        cache.set(path, binary.model_dump(mode="json"))
+        return binary
+
+    def supports(self, flag: str) -> bool:
+        """
+        Whether the executable accepts the given CLI flag.
+        If the flags could not be determined, assume it does.
+        """
+        return not self.flags or flag in self.flags
+
+
+def _run(path: str, *args: str) -> str:
+    result = run([path, *args], stdout=PIPE, stderr=PIPE, stdin=PIPE)
+    if result.returncode != 0:
+        raise FoundrySubprocessError(
+            "Anvil executable returned error code. See ape-foundry README for install steps."
+        )
+
+    return result.stdout.decode("utf8", errors="replace").strip()
@@ -0,0 +1,38 @@
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Any, Optional
+
+
+class JSONCache:
+    """
+    A small key-value cache persisted as a JSON file, shared by processes.
+    Writes are atomic, and when ``max_entries`` is set, the least-recently
+    written entries are dropped beyond that size.
+    """
+
+    def __init__(self, path: Path, max_entries: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._read().get(key, default)
+
+    def set(self, key: str, value: Any):
+        data = self._read()
+        data.pop(key, None)
+        data[key] = value
+        if self.max_entries is not None and len(data) > self.max_entries:
+            data = dict(islice(data.items(), len(data) - self.max_entries, None))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, self.path)
@@ -1,5 +1,10 @@
+from typing import TYPE_CHECKING
+
 from ape.exceptions import ProviderError, SubprocessError
 
+if TYPE_CHECKING:
+    from ape_foundry.batch import BatchRequest
+
 
 class FoundryProviderError(ProviderError):
     """
@@ -22,3 +27,18 @@ class FoundryNotInstalledError(FoundrySubprocessError):
         super().__init__(
             "Missing local Foundry node client. See ape-foundry README for install steps."
         )
+
+
+class FoundryBatchError(FoundryProviderError):
+    """
+    Raised when requests in a batch (see ``FoundryProvider.batch_requests()``) fail.
+    """
+
+    def __init__(self, failed: list["BatchRequest"]):
+        self.failed = failed
+        details = "\n".join(
+            f"  [{request.index}] {request.method}({', '.join(map(str, request.params))}): "
+            f"{request.error_message}"
+            for request in failed
+        )
+        super().__init__(f"{len(failed)} batched request(s) failed:\n{details}")
@@ -0,0 +1,408 @@
+import atexit
+import hashlib
+import os
+import socket
+from pathlib import Path
+from signal import SIGTERM
+from subprocess import DEVNULL
+from typing import TYPE_CHECKING, Optional
+
+from ape.api.providers import popen
+from ape.logging import logger
+from ape.utils.process import spawn
+from pydantic import BaseModel
+from web3 import HTTPProvider
+
+from ape_foundry.exceptions import FoundrySubprocessError
+from ape_foundry.process import AnvilReadinessProbe, pid_is_alive, port_is_open
+
+if TYPE_CHECKING:
+    from ape_foundry.ports import PortRegistry
+
+
+class PoolMember(BaseModel):
+    """
+    A pre-started Anvil process managed by an :class:`~ape_foundry.pool.AnvilPool`.
+    """
+
+    pid: int
+    port: int
+    snapshot: Optional[str] = None
+    """A snapshot of the pristine chain state, used to reset the node on release."""
+
+    owner: Optional[int] = None
+    """The process ID of the client leasing this member."""
+
+    impersonated: list[str] = []
+    """Accounts impersonated by the client leasing this member, stopped on release."""
+
+    @property
+    def uri(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def file_name(self) -> str:
+        return f"{self.port}.json"
+
+    @property
+    def is_alive(self) -> bool:
+        # NOTE: Also check the port, as exited-but-unreaped processes still have a PID.
+        return pid_is_alive(self.pid) and port_is_open("127.0.0.1", self.port)
+
+    def request(self, method: str, params: list):
+        response = HTTPProvider(self.uri).make_request(method, params)  # type: ignore[arg-type]
+        if "error" in response:
+            raise FoundrySubprocessError(f"Pooled Anvil request failed: {response['error']}")
+
+        return response.get("result")
+
+    def terminate(self):
+        try:
+            os.kill(self.pid, SIGTERM)
+        except OSError:
+            pass
+
+
+class AnvilPool:
+    """
+    A cross-process pool of idle, pre-started Anvil processes, all started with the
+    same command arguments. Members are tracked as JSON files beneath the pool's
+    directory and are claimed atomically by renaming them from ``idle/`` to ``leased/``,
+    so concurrent clients (such as ``pytest-xdist`` workers) never share a node.
+
+    The idle members are stopped when the last client process using the pool exits,
+    unless the pool is ``persistent`` (as used for daemons), in which case members
+    live until stopped explicitly via :meth:`~ape_foundry.pool.AnvilPool.shutdown`.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        command: list[str],
+        size: int,
+        timeout: int = 20,
+        ports: Optional["PortRegistry"] = None,
+        persistent: bool = False,
+    ):
+        self.command = command
+        self.size = size
+        self.timeout = timeout
+        self.ports = ports
+        self.persistent = persistent
+        self.path = base_path / command_key(command)
+        self._registered = False
+        self._closed = False
+
+    @property
+    def idle_path(self) -> Path:
+        return self.path / "idle"
+
+    @property
+    def leased_path(self) -> Path:
+        return self.path / "leased"
+
+    @property
+    def starting_path(self) -> Path:
+        return self.path / "starting"
+
+    @property
+    def clients_path(self) -> Path:
+        return self.path / "clients"
+
+    def _members(self, path: Path) -> list[tuple[Path, PoolMember]]:
+        if not path.is_dir():
+            return []
+
+        members = []
+        for file in path.glob("*.json"):
+            try:
+                members.append((file, PoolMember.model_validate_json(file.read_text())))
+            except (OSError, ValueError):
+                # Being moved or written by another process.
+                continue
+
+        return members
+
+    def members(self) -> list[PoolMember]:
+        """
+        All idle and leased members.
+        """
+        return [m for _, m in (*self._members(self.idle_path), *self._members(self.leased_path))]
+
+    def claim(self) -> Optional[PoolMember]:
+        """
+        Claim an idle member, if any are available.
+        """
+        self._reclaim()
+        self.leased_path.mkdir(parents=True, exist_ok=True)
+        for file, candidate in self._members(self.idle_path):
+            candidate.owner = os.getpid()
+            leased_file = self.leased_path / file.name
+            try:
+                os.rename(file, leased_file)
+            except OSError:
+                # Claimed by another client.
+                continue
+
+            if candidate.is_alive:
+                leased_file.write_text(candidate.model_dump_json())
+                return candidate
+
+            leased_file.unlink(missing_ok=True)
+
+        return None
+
+    def lease(self) -> PoolMember:
+        """
+        Claim an idle member, starting a new one if none are available.
+        The pool is refilled in the background afterwards.
+        """
+        self._register_client()
+        if (member := self.claim()) is None:
+            member = self._start_member()
+            member.owner = os.getpid()
+            leased_file = self.leased_path / member.file_name
+            os.rename(self.starting_path / member.file_name, leased_file)
+            leased_file.write_text(member.model_dump_json())
+
+        spawn(self.fill)
+        return member
+
+    def release(self, member: PoolMember):
+        """
+        Reset the member to its pristine state and return it to the pool.
+        If the member cannot be reset, it is replaced.
+        """
+        leased_file = self.leased_path / member.file_name
+        if len(self._members(self.idle_path)) >= self.size:
+            # The pool is already full.
+            member.terminate()
+            leased_file.unlink(missing_ok=True)
+            return
+
+        try:
+            self._reset(member)
+        except Exception as err:
+            logger.debug(f"Replacing pooled Anvil process '{member.pid}': {err}")
+            member.terminate()
+            leased_file.unlink(missing_ok=True)
+            if not self._closed and not self.persistent:
+                spawn(self.fill)
+
+            return
+
+        member.owner = None
+        self.idle_path.mkdir(parents=True, exist_ok=True)
+        leased_file.write_text(member.model_dump_json())
+        os.rename(leased_file, self.idle_path / member.file_name)
+
+    def fill(self):
+        """
+        Start members until the pool has ``size`` idle (or starting) members.
+        """
+        self._prune()
+        pending = len(self._members(self.idle_path)) + len(self._members(self.starting_path))
+        for _ in range(max(self.size - pending, 0)):
+            if self._closed:
+                break
+
+            try:
+                member = self._start_member()
+            except Exception as err:
+                logger.debug(f"Failed to start pooled Anvil process: {err}")
+                break
+
+            self.idle_path.mkdir(parents=True, exist_ok=True)
+            os.rename(self.starting_path / member.file_name, self.idle_path / member.file_name)
+
+    def shutdown(self, force: bool = False):
+        """
+        Stop all idle members and any members leased by clients that no longer exist.
+
+        Args:
+            force (bool): Also stop members leased by running clients.
+        """
+        self._closed = True
+        for path in (self.idle_path, self.starting_path, self.leased_path):
+            for file, member in self._members(path):
+                owner = member.owner
+                if path == self.leased_path and owner is not None and owner != os.getpid():
+                    if not force and pid_is_alive(owner):
+                        continue
+
+                member.terminate()
+                file.unlink(missing_ok=True)
+
+    def _start_member(self) -> PoolMember:
+        port = self.ports.lease() if self.ports is not None else find_free_port()
+        cmd = with_port(self.command, port)
+
+        # NOTE: Pooled processes are detached so they may outlive the client that started
+        #   them; they are stopped via `shutdown()` by the last client to exit instead.
+        process = popen(cmd, stdout=DEVNULL, stderr=DEVNULL, start_new_session=True)
+        if self.ports is not None:
+            # The lease lives as long as the pooled process.
+            self.ports.transfer(port, process.pid)
+
+        member = PoolMember(pid=process.pid, port=port)
+        self.starting_path.mkdir(parents=True, exist_ok=True)
+        starting_file = self.starting_path / member.file_name
+        starting_file.write_text(member.model_dump_json())
+        try:
+            if not AnvilReadinessProbe(port, process=process).wait(self.timeout):
+                raise FoundrySubprocessError("Timed-out waiting for pooled Anvil to start.")
+
+            member.snapshot = member.request("evm_snapshot", [])
+        except Exception:
+            member.terminate()
+            starting_file.unlink(missing_ok=True)
+            raise
+
+        starting_file.write_text(member.model_dump_json())
+        return member
+
+    def _reset(self, member: PoolMember):
+        if self._closed or not member.snapshot:
+            raise FoundrySubprocessError("Pooled Anvil cannot be reset.")
+
+        member.request("evm_revert", [member.snapshot])
+        member.snapshot = member.request("evm_snapshot", [])
+
+        # NOTE: Reverting a snapshot does not undo node settings, so they are
+        #   restored to those the member was started with.
+        for address in member.impersonated:
+            member.request("anvil_stopImpersonatingAccount", [address])
+
+        member.impersonated = []
+        for method, params in get_reset_requests(self.command):
+            member.request(method, params)
+
+        if "--gas-price" in self.command:
+            gas_price = int(self.command[self.command.index("--gas-price") + 1])
+            try:
+                member.request("anvil_setMinGasPrice", [hex(gas_price)])
+            except FoundrySubprocessError:
+                # Not supported with EIP-1559, so could not have been changed either.
+                pass
+
+    def _prune(self):
+        for path in (self.idle_path, self.starting_path):
+            for file, member in self._members(path):
+                if not member.is_alive:
+                    file.unlink(missing_ok=True)
+
+        self._reclaim()
+
+    def _reclaim(self):
+        # Return members leased by clients that exited without releasing them.
+        for file, member in self._members(self.leased_path):
+            owner = member.owner
+            if owner is None or owner == os.getpid() or pid_is_alive(owner):
+                continue
+
+            # NOTE: Moved to `starting/` while being reset, so only one client reclaims it.
+            self.starting_path.mkdir(parents=True, exist_ok=True)
+            reclaiming_file = self.starting_path / file.name
+            try:
+                os.rename(file, reclaiming_file)
+            except OSError:
+                # Reclaimed by another client.
+                continue
+
+            try:
+                if not member.is_alive:
+                    raise FoundrySubprocessError("Pooled Anvil exited.")
+
+                self._reset(member)
+            except Exception as err:
+                logger.debug(f"Stopping orphaned pooled Anvil process '{member.pid}': {err}")
+                member.terminate()
+                reclaiming_file.unlink(missing_ok=True)
+                continue
+
+            member.owner = None
+            reclaiming_file.write_text(member.model_dump_json())
+            self.idle_path.mkdir(parents=True, exist_ok=True)
+            os.rename(reclaiming_file, self.idle_path / member.file_name)
+
+    def _register_client(self):
+        if self._registered or self.persistent:
+            return
+
+        self.clients_path.mkdir(parents=True, exist_ok=True)
+        (self.clients_path / f"{os.getpid()}").touch()
+        atexit.register(self._unregister_client)
+        self._registered = True
+
+    def _unregister_client(self):
+        (self.clients_path / f"{os.getpid()}").unlink(missing_ok=True)
+        if not any(
+            pid_is_alive(int(file.name))
+            for file in self.clients_path.iterdir()
+            if file.name.isnumeric()
+        ):
+            # Last client out.
+            self.shutdown()
+
+
+_POOLS: dict[Path, AnvilPool] = {}
+
+
+def get_pool(
+    base_path: Path,
+    command: list[str],
+    size: int,
+    timeout: int = 20,
+    ports: Optional["PortRegistry"] = None,
+) -> AnvilPool:
+    """
+    Get the pool for the given command, re-using the same instance within a process.
+    """
+    pool = AnvilPool(base_path, command, size, timeout=timeout, ports=ports)
+    if pool.path in _POOLS:
+        return _POOLS[pool.path]
+
+    _POOLS[pool.path] = pool
+    return pool
+
+
+def command_key(command: list[str]) -> str:
+    """
+    A key identifying processes started with the same arguments, ignoring the port.
+    """
+    args = with_port(command, 0)[1:]  # Also ignore the binary location.
+    return hashlib.sha256("\0".join(args).encode("utf8")).hexdigest()[:16]
+
+
+def with_port(command: list[str], port: int) -> list[str]:
+    cmd = list(command)
+    if "--port" in cmd:
+        cmd[cmd.index("--port") + 1] = f"{port}"
+    else:
+        cmd.extend(("--port", f"{port}"))
+
+    return cmd
+
+
+def get_reset_requests(command: list[str]) -> list[tuple[str, list]]:
+    """
+    The requests restoring the node settings of a process started with the given
+    command arguments, such as its mining mode, as reverting a snapshot does not.
+    """
+    requests: list[tuple[str, list]] = [
+        ("anvil_autoImpersonateAccount", [False]),
+        ("anvil_setLoggingEnabled", ["--silent" not in command]),
+    ]
+    if "--block-time" in command:
+        block_time = int(command[command.index("--block-time") + 1])
+        requests.append(("evm_setIntervalMining", [block_time]))
+    else:
+        requests.append(("evm_setAutomine", ["--no-mining" not in command]))
+
+    return requests
+
+
+def find_free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import socket
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: leases are still recorded, but not locked.
+    fcntl = None  # type: ignore
+
+from ape_foundry.exceptions import FoundryProviderError
+from ape_foundry.process import pid_is_alive
+
+WORKER_PORT_STRIDE = 100
+"""The number of ports between the preferred ports of consecutive ``pytest-xdist`` workers."""
+
+
+class PortRegistry:
+    """
+    A cross-process registry of leased RPC ports, stored in a file-locked JSON file.
+    Ports are only leased if no live process holds a lease and the port can be bound,
+    so concurrent sessions never spawn Anvil on a port that is already taken.
+    """
+
+    def __init__(self, path: Path, start: int, end: int, max_attempts: int = 256):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.max_attempts = max_attempts
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_suffix(".lock")
+
+    @contextmanager
+    def _leases(self) -> Iterator[dict[str, dict]]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            try:
+                leases = json.loads(self.path.read_text()) if self.path.is_file() else {}
+            except ValueError:
+                leases = {}
+
+            # Drop leases held by processes that no longer exist.
+            leases = {p: lease for p, lease in leases.items() if pid_is_alive(lease["pid"])}
+            try:
+                yield leases
+                self.path.write_text(json.dumps(leases))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def candidates(self, worker_id: Optional[str] = None) -> Iterator[int]:
+        """
+        Ports in the order they should be tried. Each ``pytest-xdist`` worker
+        starts at its own offset so workers rarely contend for the same ports.
+        """
+        span = self.end - self.start + 1
+        if (index := worker_index(worker_id)) is not None:
+            offset = (index * WORKER_PORT_STRIDE) % span
+        else:
+            offset = random.randrange(span)
+
+        for step in range(min(self.max_attempts, span)):
+            yield self.start + (offset + step) % span
+
+    def lease(
+        self,
+        exclude: Iterable[int] = (),
+        worker_id: Optional[str] = None,
+        pid: Optional[int] = None,
+    ) -> int:
+        """
+        Lease an available port.
+
+        Args:
+            exclude (Iterable[int]): Ports to skip, such as previously failed ports.
+            worker_id (Optional[str]): The ``pytest-xdist`` worker ID, e.g. ``"gw3"``.
+              Defaults to the current worker, if any.
+            pid (Optional[int]): The process holding the lease. Defaults to this process.
+
+        Returns:
+            int: The leased port.
+        """
+        excluded = set(exclude)
+        worker_id = worker_id or os.environ.get("PYTEST_XDIST_WORKER")
+        with self._leases() as leases:
+            for port in self.candidates(worker_id):
+                if port in excluded or f"{port}" in leases or not port_is_available(port):
+                    continue
+
+                leases[f"{port}"] = {"pid": pid or os.getpid(), "worker": worker_id}
+                return port
+
+        raise FoundryProviderError(
+            f"Unable to find an available port in range {self.start}-{self.end}."
+        )
+
+    def transfer(self, port: int, pid: int):
+        """
+        Hand a lease to another process, such as the Anvil process now bound to it.
+        """
+        with self._leases() as leases:
+            if f"{port}" in leases:
+                leases[f"{port}"]["pid"] = pid
+
+    def release(self, port: int):
+        with self._leases() as leases:
+            leases.pop(f"{port}", None)
+
+
+def worker_index(worker_id: Optional[str]) -> Optional[int]:
+    if worker_id and worker_id.startswith("gw") and worker_id[2:].isnumeric():
+        return int(worker_id[2:])
+
+    return None
+
+
+def port_is_available(port: int, host: str = "127.0.0.1") -> bool:
+    with socket.socket() as sock:
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+
+    return True
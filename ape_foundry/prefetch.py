@@ -0,0 +1,135 @@
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Union
+
+from eth_utils import to_hex
+from pydantic import BaseModel, field_validator
+
+from ape_foundry.batch import RequestBatch
+
+if TYPE_CHECKING:
+    from ape_foundry.batch import BatchRequest
+
+DEFAULT_PREFETCH_BATCH_SIZE = 100
+DEFAULT_PREFETCH_CONCURRENCY = 8
+
+
+class PrefetchTarget(BaseModel):
+    """
+    An account to prefetch from a fork's upstream provider, with any storage slots.
+    """
+
+    address: str
+    """The address of the account or contract."""
+
+    slots: list[int] = []
+    """Storage slots to prefetch, e.g. ``[0, "0x3"]``."""
+
+    slot_ranges: list[tuple[int, int]] = []
+    """Ranges of storage slots to prefetch, each from its start up to (excluding) its stop."""
+
+    @field_validator("slots", mode="before")
+    @classmethod
+    def _validate_slots(cls, value):
+        return [int(v, 0) if isinstance(v, str) else v for v in value or []]
+
+    @field_validator("slot_ranges", mode="before")
+    @classmethod
+    def _validate_slot_ranges(cls, value):
+        return [[int(v, 0) if isinstance(v, str) else v for v in r] for r in value or []]
+
+    @property
+    def storage_slots(self) -> list[int]:
+        """
+        All the slots to prefetch, in order and without duplicates.
+        """
+        slots = set(self.slots)
+        for start, stop in self.slot_ranges:
+            slots.update(range(start, stop))
+
+        return sorted(slots)
+
+
+class AccountState(BaseModel):
+    """
+    The state of an account fetched by :func:`~ape_foundry.prefetch.fetch_state`.
+    """
+
+    address: str
+    balance: int = 0
+    nonce: int = 0
+    code: str = "0x"
+    storage: dict[int, str] = {}
+
+
+def fetch_state(
+    send: Callable[[list[tuple[str, list]]], Sequence[dict]],
+    targets: Iterable[Union[PrefetchTarget, dict, str]],
+    block_id: Union[int, str],
+    batch_size: int = DEFAULT_PREFETCH_BATCH_SIZE,
+    max_concurrency: int = DEFAULT_PREFETCH_CONCURRENCY,
+) -> list[AccountState]:
+    """
+    Fetch the balance, nonce, code and storage slots of accounts at a block, sending
+    JSON-RPC batches of up to ``batch_size`` requests, ``max_concurrency`` at a time,
+    rather than one request at a time.
+
+    Args:
+        send (Callable): Sends a list of ``(method, params)`` and returns the
+          responses in the same order, such as to a fork's upstream provider.
+        targets (Iterable[Union[:class:`~ape_foundry.prefetch.PrefetchTarget`, dict, str]]):
+          The accounts, or just their addresses.
+        block_id (Union[int, str]): The block to fetch the state at.
+        batch_size (int): The maximum number of requests per batch.
+        max_concurrency (int): The maximum number of batches in flight at once.
+
+    Raises:
+        :class:`~ape_foundry.exceptions.FoundryBatchError`: When any request failed.
+
+    Returns:
+        list[:class:`~ape_foundry.prefetch.AccountState`]
+    """
+    block = to_hex(block_id) if isinstance(block_id, int) else block_id
+    batches: list[RequestBatch] = []
+    requests: list[tuple[AccountState, str, "BatchRequest"]] = []
+    states = []
+
+    def add(method: str, params: list) -> "BatchRequest":
+        if not batches or len(batches[-1].pending) >= batch_size:
+            batches.append(RequestBatch(send, size=batch_size))
+
+        return batches[-1].add(method, params)
+
+    for target in targets:
+        if isinstance(target, str):
+            target = PrefetchTarget(address=target)
+        elif isinstance(target, dict):
+            target = PrefetchTarget.model_validate(target)
+
+        state = AccountState(address=target.address)
+        states.append(state)
+        for field, method in (
+            ("balance", "eth_getBalance"),
+            ("nonce", "eth_getTransactionCount"),
+            ("code", "eth_getCode"),
+        ):
+            requests.append((state, field, add(method, [target.address, block])))
+
+        for slot in target.storage_slots:
+            request = add("eth_getStorageAt", [target.address, to_hex(slot), block])
+            requests.append((state, f"{slot}", request))
+
+    if batches:
+        with ThreadPoolExecutor(min(max_concurrency, len(batches))) as executor:
+            # NOTE: Raises the first batch's error, if any.
+            list(executor.map(RequestBatch.flush, batches))
+
+    for state, field, request in requests:
+        if field in ("balance", "nonce"):
+            setattr(state, field, int(request.result, 16))
+        elif field == "code":
+            state.code = request.result or "0x"
+        else:
+            state.storage[int(field)] = request.result
+
+    return states
@@ -0,0 +1,138 @@
+import os
+import socket
+import time
+from pathlib import Path
+from subprocess import Popen
+from typing import Optional
+
+from ape_foundry.exceptions import FoundrySubprocessError
+
+LISTENING_KEY = "Listening on"
+
+
+class LogTail:
+    """
+    Incrementally read lines appended to a log file, so that
+    each poll only reads the new bytes rather than the whole file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._partial = ""
+
+        # Skip any content that existed before tailing began,
+        # such as output from a previous session.
+        if stat := self._stat():
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return self.path.stat()
+        except OSError:
+            return None
+
+    def read_lines(self) -> list[str]:
+        """
+        Get all complete lines written since the last read.
+        """
+        if not (stat := self._stat()):
+            return []
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # The file was re-created or truncated; start over.
+            self._inode = stat.st_ino
+            self._offset = 0
+            self._partial = ""
+
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, "r", encoding="utf8", errors="replace") as file:
+            file.seek(self._offset)
+            data = file.read()
+            self._offset = file.tell()
+
+        *lines, self._partial = f"{self._partial}{data}".split("\n")
+        return lines
+
+
+class AnvilReadinessProbe:
+    """
+    Detect when a freshly spawned Anvil process is accepting RPC connections.
+    Readiness is signaled by either the ``Listening on`` output line or the
+    RPC port accepting TCP connections, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        process: Optional[Popen] = None,
+        log_path: Optional[Path] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.process = process
+        self.log_tail = LogTail(log_path) if log_path is not None else None
+
+    def is_listening(self) -> bool:
+        if self.log_tail is not None and any(
+            line.startswith(LISTENING_KEY) for line in self.log_tail.read_lines()
+        ):
+            return True
+
+        return port_is_open(self.host, self.port)
+
+    def check_process(self):
+        if self.process is not None and (exit_code := self.process.poll()) is not None:
+            raise FoundrySubprocessError(
+                f"Anvil process exited with code '{exit_code}' before it began listening."
+            )
+
+    def wait(self, timeout: float, max_interval: float = 0.1) -> bool:
+        """
+        Block until Anvil is listening or the deadline passes.
+
+        Args:
+            timeout (float): Seconds of wall-clock time to wait.
+            max_interval (float): The longest sleep between polls.
+
+        Returns:
+            bool: ``True`` when ready, ``False`` when timed-out.
+        """
+        deadline = time.monotonic() + timeout
+        interval = 0.005
+        while True:
+            self.check_process()
+            if self.is_listening():
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
+
+def port_is_open(host: str, port: int, timeout: float = 0.1) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def pid_is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists but owned by another user.
+        return True
+
+    return True
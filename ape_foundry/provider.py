@@ -1,9 +1,13 @@
 import os
-import random
-import shutil
+import platform
+import tempfile
+import time
 from bisect import bisect_right
-from subprocess import PIPE, call
-from typing import TYPE_CHECKING, Literal, Optional, Union, cast
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from subprocess import DEVNULL, PIPE
+from typing import TYPE_CHECKING, Any, Literal, Optional, Union, cast
 
 from ape.api import (
     BlockAPI,
@@ -15,27 +19,38 @@ from ape.api import (
     TraceAPI,
     TransactionAPI,
 )
+from ape.api.providers import _linux_set_death_signal, popen
 from ape.exceptions import (
     ContractLogicError,
     OutOfGasError,
+    ProviderError,
+    ProviderNotConnectedError,
+    RPCTimeoutError,
     SubprocessError,
     TransactionError,
     VirtualMachineError,
 )
-from ape.logging import logger
+from ape.logging import LogLevel, logger
 from ape.utils import cached_property
+from ape.utils.process import JoinableQueue, spawn
 from ape_ethereum.provider import Web3Provider
+from ape_ethereum.trace import TraceApproach
 from ape_test import ApeTestConfig
-from eth_pydantic_types import HexBytes, HexBytes32
-from eth_typing import HexStr
-from eth_utils import add_0x_prefix, is_0x_prefixed, is_hex, to_hex
+from eth_pydantic_types import HexBytes
+from eth_utils import to_hex
 from pydantic import field_validator, model_validator
 from pydantic_settings import SettingsConfigDict
-from web3 import HTTPProvider, Web3
+from web3 import HTTPProvider, IPCProvider, Web3
 from web3.exceptions import ContractCustomError
 from web3.exceptions import ContractLogicError as Web3ContractLogicError
-from web3.exceptions import ExtraDataLengthError
+from web3.exceptions import ContractPanicError, ExtraDataLengthError
 from web3.gas_strategies.rpc import rpc_gas_price_strategy
+from web3.types import RPCEndpoint
+
+try:
+    from web3 import LegacyWebSocketProvider as WebSocketProvider  # type: ignore
+except ImportError:
+    from web3 import WebsocketProvider as WebSocketProvider  # type: ignore
 
 try:
     from web3.middleware import ExtraDataToPOAMiddleware  # type: ignore
@@ -45,13 +60,40 @@ except ImportError:
 from web3.middleware.validation import MAX_EXTRADATA_LENGTH
 from yarl import URL
 
+from ape_foundry.aio import DEFAULT_MAX_CONCURRENCY, AsyncFoundryClient
+from ape_foundry.batch import DEFAULT_BATCH_SIZE, RequestBatch
+from ape_foundry.binary import AnvilBinary
+from ape_foundry.cache import JSONCache
 from ape_foundry.constants import EVM_VERSION_BY_NETWORK
 from ape_foundry.exceptions import (
+    FoundryBatchError,
     FoundryNotInstalledError,
     FoundryProviderError,
     FoundrySubprocessError,
 )
+from ape_foundry.pool import AnvilPool, PoolMember, command_key, get_pool
+from ape_foundry.ports import PortRegistry
+from ape_foundry.prefetch import (
+    DEFAULT_PREFETCH_BATCH_SIZE,
+    DEFAULT_PREFETCH_CONCURRENCY,
+    AccountState,
+    PrefetchTarget,
+    fetch_state,
+)
+from ape_foundry.process import AnvilReadinessProbe, pid_is_alive
+from ape_foundry.proxy import ProxyMode, UpstreamProxy, UpstreamStore, get_shared_proxy_uri
+from ape_foundry.revert import ErrorSelectorIndex, get_revert_data
+from ape_foundry.session import SessionStats, create_session, session_stats
+from ape_foundry.state import StateTemplates, state_key
+from ape_foundry.streaming import iter_json_items
 from ape_foundry.trace import AnvilTransactionTrace
+from ape_foundry.trace_cache import (
+    DEFAULT_TRACE_CACHE_SIZE,
+    TraceCache,
+    TraceCacheStats,
+    get_trace_cache_key,
+)
+from ape_foundry.utils import convert_code, get_storage_params, to_quantity
 
 try:
     from ape_optimism import Optimism  # type: ignore
@@ -60,6 +102,8 @@ except ImportError:
 
 if TYPE_CHECKING:
     from ape.types import AddressType, BlockID, ContractCode, SnapshotID
+    from ethpm_types.abi import MethodABI
+    from requests import Session
 
 
 EPHEMERAL_PORTS_START = 49152
@@ -73,6 +117,37 @@ class FoundryForkConfig(PluginConfig):
     block_number: Optional[int] = None
     evm_version: Optional[str] = None
 
+    upstream_mode: Optional[ProxyMode] = None
+    """
+    Route Anvil's requests to the upstream provider through a local proxy that
+    records the responses (``"record"``) or serves recorded responses with no
+    network access (``"replay"``), for fast, deterministic and offline fork
+    sessions. ``"cache"`` uses one proxy shared by all processes on the host,
+    which caches historical reads and sends identical concurrent requests
+    upstream once, so forks of the same block are warmed once per host.
+    Defaults to ``None`` (Anvil requests the upstream directly).
+    """
+
+    upstream_rate_limit: Optional[float] = None
+    """
+    The maximum number of requests per second the upstream proxy sends upstream.
+    With ``"cache"``, the limit is shared by all processes on the host.
+    Defaults to ``None`` (no limit).
+    """
+
+    prefetch: list[PrefetchTarget] = []
+    """
+    Accounts (and optionally their storage ``slots`` and ``slot_ranges``) to fetch
+    from the upstream provider concurrently when a fork node starts, rather than
+    one at a time as transactions first touch them.
+    """
+
+    upstream_store: Optional[Path] = None
+    """
+    The file to record upstream responses in, relative to the project.
+    Defaults to a file per network in the plugin's data folder.
+    """
+
 
 class FoundryNetworkConfig(PluginConfig):
     host: Optional[Union[str, Literal["auto"]]] = None
@@ -91,6 +166,69 @@ class FoundryNetworkConfig(PluginConfig):
     request_timeout: int = 30
     fork_request_timeout: int = 300
     process_attempts: int = 5
+    process_start_timeout: int = 20
+    """
+    Seconds of wall-clock time to wait for a started Anvil process to accept connections.
+    """
+
+    use_daemon: bool = True
+    """
+    Attach to a running daemon started via ``ape foundry start``, when its
+    arguments match, instead of starting a new process. Defaults to ``True``.
+    """
+
+    process_pool_size: int = 0
+    """
+    The number of idle, pre-started Anvil processes to keep warm, so connecting
+    providers (such as ``pytest-xdist`` workers) lease a ready node rather than
+    paying the startup cost. Defaults to ``0`` (disabled).
+    """
+
+    state_template: Optional[str] = None
+    """
+    The name of a state template (see ``FoundryProvider.state_template()``)
+    to load into newly started nodes, when one exists for the current
+    compiled contracts and config.
+    """
+
+    transport: Literal["http", "ipc", "ws"] = "http"
+    """
+    How to send requests to the node. ``"ipc"`` uses a Unix-domain socket to processes
+    the provider starts, avoiding the HTTP and TCP overhead of each request; the process
+    still serves HTTP on its port for external tools, and pooled and daemon processes
+    always use HTTP. ``"ws"`` keeps a persistent WebSocket connection, which the async
+    client (see ``FoundryProvider.async_client``) pipelines requests over and uses for
+    subscriptions. Defaults to ``"http"``.
+    """
+
+    ipc_path: Optional[Path] = None
+    """
+    The IPC socket path when using the ``"ipc"`` transport.
+    Defaults to a path in the temporary directory, unique to the port.
+    """
+
+    http_pool_size: int = 10
+    """
+    The maximum number of HTTP connections to keep open to the node, such as for
+    requests from multiple threads. Defaults to ``10``.
+    """
+
+    http_keep_alive: bool = True
+    """
+    Reuse HTTP connections across requests. Defaults to ``True``.
+    """
+
+    http_retries: int = 0
+    """
+    The number of times to retry failing to connect to the node over HTTP,
+    with exponential backoff. Requests are never retried once sent.
+    Defaults to ``0``.
+    """
+
+    http_retry_backoff_factor: float = 0.1
+    """
+    Scales the delay between HTTP connection retries. Defaults to ``0.1``.
+    """
 
     # RPC defaults
     base_fee: int = 0
@@ -125,24 +263,65 @@ class FoundryNetworkConfig(PluginConfig):
     this flag is automatically added.
     """
 
+    trace_cache_size: int = DEFAULT_TRACE_CACHE_SIZE
+    """
+    The maximum size, in bytes, of trace data (such as ``trace_transaction`` results)
+    cached in memory, so features reading the same transaction's trace fetch it once.
+    Set to ``0`` to disable. Defaults to 64 MiB.
+    """
+
+    trace_cache_spill: bool = False
+    """
+    Spill trace data evicted from memory to compressed files on disk
+    rather than dropping it. Defaults to ``False``.
+    """
+
+    trace_prefetch_blocks: int = 0
+    """
+    When a transaction's trace is not cached, also fetch the traces of up to this
+    many following blocks, all in one batch, as gas and coverage reports read the
+    traces of a test's transactions in block order. Only blocks mined by the node
+    are prefetched, up to the latest block. Defaults to ``0`` (disabled).
+    """
+
+    call_trace_approach: TraceApproach = TraceApproach.PARITY
+    """
+    How to build call trees. ``"parity"`` uses ``trace_transaction`` and
+    ``"geth-call-tracer"`` uses the native ``callTracer`` of ``debug_traceTransaction``,
+    both computed by the node. Defaults to ``"parity"``.
+    """
+
     model_config = SettingsConfigDict(extra="allow")
 
+    @field_validator("call_trace_approach", mode="before")
+    @classmethod
+    def _validate_call_trace_approach(cls, value):
+        # NOTE: Allows nicer config values, such as "geth-call-tracer".
+        return TraceApproach.PARITY if value is None else TraceApproach.from_key(value)
+
     @field_validator("fork", mode="before")
     @classmethod
     def _validate_fork(cls, value):
         return value or {}
 
 
-def _call(*args):
-    return call([*args], stderr=PIPE, stdout=PIPE, stdin=PIPE)
-
-
 class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
     _host: Optional[str] = None
     attempted_ports: list[int] = []
     cached_chain_id: Optional[int] = None
     _did_warn_wrong_node = False
     _disconnected: Optional[bool] = None
+    _pool: Optional[AnvilPool] = None
+    _pool_member: Optional[PoolMember] = None
+    _port_lease: Optional[int] = None
+    _web3_host: Optional[str] = None
+    _genesis_hash: Optional[str] = None
+    _ipc_path: Optional[Path] = None
+    _batch: Optional[RequestBatch] = None
+    _method_abis: dict[tuple[str, str], "MethodABI"] = {}
+    """Method ABIs resolved for return values, by address and selector."""
+    _error_selector_index: Optional[ErrorSelectorIndex] = None
+    _error_selector_index_key: Optional[tuple] = None
 
     @property
     def unlocked_accounts(self) -> list["AddressType"]:
@@ -209,17 +388,140 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
             return FOUNDRY_CHAIN_ID
 
     @cached_property
+    def anvil_binary(self) -> AnvilBinary:
+        """
+        The installed Anvil executable, its version and supported flags.
+        Cached on disk so only the first session per installation runs it.
+        """
+        return AnvilBinary.resolve(self.config_manager.DATA_FOLDER / self.name / "anvil_bin.json")
+
+    @property
     def anvil_bin(self) -> str:
-        anvil = shutil.which("anvil")
+        return self.anvil_binary.path
+
+    @property
+    def _network_cache(self) -> JSONCache:
+        # Facts that never change for a chain, e.g. whether it uses PoA,
+        # keyed by chain ID and genesis hash.
+        return JSONCache(
+            self.config_manager.DATA_FOLDER / self.name / "networks.json", max_entries=256
+        )
+
+    @cached_property
+    def http_session(self) -> "Session":
+        """
+        The HTTP session used for all requests to the node, shared across
+        reconnects so that open connections are reused.
+        """
+        return create_session(
+            pool_size=self.settings.http_pool_size,
+            keep_alive=self.settings.http_keep_alive,
+            retries=self.settings.http_retries,
+            backoff_factor=self.settings.http_retry_backoff_factor,
+        )
 
-        if not anvil:
-            raise FoundryNotInstalledError()
-        elif _call(anvil, "--version") != 0:
-            raise FoundrySubprocessError(
-                "Anvil executable returned error code. See ape-foundry README for install steps."
+    @property
+    def http_session_stats(self) -> SessionStats:
+        """
+        Counters for the connections opened and reused by
+        :attr:`~ape_foundry.provider.FoundryProvider.http_session`.
+        """
+        return session_stats(self.http_session)
+
+    @cached_property
+    def trace_cache(self) -> Optional[TraceCache]:
+        """
+        Trace data cached for this provider's chain, or ``None`` when disabled.
+        Cleared whenever the chain's history may change, such as on ``restore()``.
+        """
+        if self.settings.trace_cache_size <= 0:
+            return None
+
+        path = None
+        if self.settings.trace_cache_spill:
+            path = (
+                self.config_manager.DATA_FOLDER / self.name / "traces" / f"{os.getpid()}-{id(self)}"
             )
 
-        return anvil
+        return TraceCache(max_bytes=self.settings.trace_cache_size, path=path)
+
+    @property
+    def trace_cache_stats(self) -> TraceCacheStats:
+        """
+        Hit and miss counters for :attr:`~ape_foundry.provider.FoundryProvider.trace_cache`.
+        """
+        return self.trace_cache.stats if self.trace_cache is not None else TraceCacheStats()
+
+    @property
+    def trace_cache_identity(self) -> str:
+        """
+        Identifies the chain trace data is cached for, as part of its keys.
+        """
+        return f"{self.chain_id}:{self._genesis_hash}"
+
+    @property
+    def _first_local_block(self) -> int:
+        # The first block mined by the node rather than fetched from elsewhere.
+        return 0
+
+    @property
+    def error_selector_index(self) -> ErrorSelectorIndex:
+        """
+        The custom errors of the project's contracts by selector, for decoding
+        revert data without tracing. Rebuilt when the project's contracts change.
+        """
+        contract_types = self.local_project.manifest.contract_types or {}
+        key = tuple(sorted((name, id(ct)) for name, ct in contract_types.items()))
+        if self._error_selector_index is None or key != self._error_selector_index_key:
+            self._error_selector_index = ErrorSelectorIndex(contract_types.values())
+            self._error_selector_index_key = key
+
+        return self._error_selector_index
+
+    def _clear_trace_cache(self):
+        if (cache := self.__dict__.get("trace_cache")) is not None:
+            cache.clear()
+
+        # NOTE: Addresses may hold different contracts after the chain changes.
+        self._method_abis.clear()
+        self._error_selector_index = None
+
+    @property
+    def async_client(self) -> AsyncFoundryClient:
+        """
+        A client with awaitable versions of this provider's methods, for keeping
+        many requests in flight at once. It uses this provider's node; close it when
+        done, e.g. ``async with provider.async_client as client: ...``.
+        """
+        return self.get_async_client()
+
+    def get_async_client(
+        self, transport: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> AsyncFoundryClient:
+        """
+        Create a client with awaitable versions of this provider's methods.
+
+        Args:
+            transport (Optional[str]): ``"http"`` or ``"ws"``. Use ``"ws"`` to pipeline
+              requests over one WebSocket connection and for subscriptions. Defaults
+              to ``"ws"`` when the ``transport`` config is ``"ws"``, else ``"http"``.
+            max_concurrency (int): The maximum number of requests in flight at once.
+
+        Returns:
+            :class:`~ape_foundry.aio.AsyncFoundryClient`
+        """
+        if not self.is_connected:
+            raise ProviderNotConnectedError()
+
+        return AsyncFoundryClient(self, max_concurrency=max_concurrency, transport=transport)
+
+    @property
+    def _port_registry(self) -> PortRegistry:
+        return PortRegistry(
+            self.config_manager.DATA_FOLDER / self.name / "ports.json",
+            EPHEMERAL_PORTS_START,
+            EPHEMERAL_PORTS_END,
+        )
 
     @property
     def uri(self) -> str:
@@ -248,6 +550,21 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
 
         return self._host
 
+    @property
+    def ipc_path(self) -> Optional[Path]:
+        """
+        The IPC socket path for processes started by this provider,
+        when using the ``"ipc"`` transport.
+        """
+        if self.settings.transport != "ipc":
+            return None
+
+        elif self.settings.ipc_path is not None:
+            return self.settings.ipc_path
+
+        # NOTE: Not in the data folder, as socket paths are limited to ~100 characters.
+        return Path(tempfile.gettempdir()) / f"anvil-{self._port or DEFAULT_PORT}.ipc"
+
     @property
     def http_uri(self) -> str:
         # NOTE: Overriding `Web3Provider.http_uri` implementation
@@ -264,12 +581,27 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
             # Hasn't tried yet.
             return False
 
+        elif self._web3 is not None and self._web3_host == self._host and self._is_alive():
+            # perf: Already verified this host; avoid repeating the handshake.
+            return True
+
         self._set_web3()
         return self._web3 is not None
 
+    def _is_alive(self) -> bool:
+        # NOTE: Only use checks that do not require any requests. When not
+        #   able to check, failing requests invalidate the connection instead.
+        if self.process is not None:
+            return self.process.poll() is None
+
+        elif self._pool_member is not None:
+            return pid_is_alive(self._pool_member.pid)
+
+        return True
+
     @property
     def gas_price(self) -> int:
-        if self.process is not None:
+        if self.process is not None or self._pool_member is not None:
             # NOTE: Workaround for bug where RPC does not honor CLI flag.
             return self.settings.gas_price
 
@@ -322,25 +654,8 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
                 self._set_web3()
                 if not self._web3:
                     # Process attempts to get started at this point.
+                    # NOTE: `start()` only returns once the node is accepting RPC.
                     self._start()
-                    if not self.stdout_logs_path.is_file():
-                        # Process output not being captured
-                        return
-
-                    wait_for_key = "Listening on"
-                    timeout = 10
-                    iterations = 0
-                    while iterations < timeout:
-                        logged_lines = [x for x in self.stdout_logs_path.read_text().split("\n")]
-                        for line in logged_lines:
-                            if line.startswith(wait_for_key):
-                                return
-
-                        iterations += 1
-                        if iterations == timeout:
-                            raise FoundryProviderError(
-                                "Timed-out waiting for process to begin listening."
-                            )
 
                 else:
                     # The user configured a host and the anvil process was already running.
@@ -365,11 +680,31 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
                 f"Failed to connect to remote Anvil node at '{self._clean_uri}'."
             )
 
+        # Only set up nodes started for this session, never existing ones.
+        if self.process is not None or self._pool_member is not None:
+            self._set_up_started_node()
+
+    def _set_up_started_node(self):
+        if template := self.settings.state_template:
+            self.load_state_template(template)
+
     def _set_web3(self):
+        self._web3_host = None
         if not self._host:
             return
 
-        self._web3 = Web3(HTTPProvider(self.uri, request_kwargs={"timeout": self.timeout}))
+        if self._ipc_path is not None:
+            self._web3 = Web3(IPCProvider(self._ipc_path, timeout=self.timeout))
+        elif self.settings.transport == "ws":
+            self._web3 = Web3(WebSocketProvider(self.ws_uri, websocket_timeout=self.timeout))
+        else:
+            self._web3 = Web3(
+                HTTPProvider(
+                    self.uri,
+                    request_kwargs={"timeout": self.timeout},
+                    session=self.http_session,
+                )
+            )
 
         try:
             is_connected = self._web3.is_connected()
@@ -393,48 +728,69 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
             # Not sure if possible to get here.
             raise FoundryProviderError("Failed to start Anvil process.")
 
-        def check_poa(block_id) -> bool:
-            try:
-                block = self.web3.eth.get_block(block_id)
-            except ExtraDataLengthError:
-                return True
-            else:
-                return (
-                    "proofOfAuthorityData" in block
-                    or len(block.get("extraData", "")) > MAX_EXTRADATA_LENGTH
-                )
+        def check_poa(block) -> bool:
+            return (
+                "proofOfAuthorityData" in block
+                or len(HexBytes(block.get("extraData") or b"")) > MAX_EXTRADATA_LENGTH
+            )
+
+        # perf: Request the genesis block raw to avoid extra-data validation errors,
+        #   and so its hash can key the cached PoA decision.
+        genesis = self._web3.provider.make_request(
+            RPCEndpoint("eth_getBlockByNumber"), ["0x0", False]
+        ).get("result")
+        self._genesis_hash = genesis.get("hash") if genesis else None
+        poa_key = f"{self._web3.eth.chain_id}:{self._genesis_hash}"
+
+        # NOTE: Each local node has a new genesis hash, so caching its decision
+        #   would only grow the cache and evict those of real networks and forks.
+        use_cache = self._genesis_hash is not None and not self.network.is_local
+        if not use_cache or (is_poa := self._network_cache.get(poa_key)) is None:
+            is_poa = bool(genesis) and check_poa(genesis)
+            if not is_poa:
+                latest = self._web3.provider.make_request(
+                    RPCEndpoint("eth_getBlockByNumber"), ["latest", False]
+                ).get("result")
+                is_poa = bool(latest) and check_poa(latest)
+
+            if use_cache:
+                self._network_cache.set(poa_key, is_poa)
 
         # Handle if using PoA
-        if any(map(check_poa, (0, "latest"))):
+        if is_poa:
             self._web3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
 
+        self._web3_host = self._host
+
+    def stream_request(self, method: str, params: Iterable, iter_path: str = "result.item"):
+        # NOTE: Overridden to parse incrementally with bounded memory over the
+        #   pooled session, and to raise JSON-RPC errors rather than yield nothing.
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": list(params)}
+        with self.http_session.post(
+            self.uri, json=payload, stream=True, timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield from iter_json_items(response.raw, iter_path)
+
+    def _make_request(self, rpc: str, parameters: Optional[Iterable] = None) -> Any:
+        try:
+            return super()._make_request(rpc, parameters=parameters)
+        except OSError:
+            # Connection-level failure (e.g. `requests.ConnectionError`);
+            # re-handshake the next time the connection is checked.
+            self._web3_host = None
+            raise
+
     def _start(self):
         if self.is_connected:
             return
 
         use_random_port = self._host == "auto"
         if use_random_port:
-            self._host = None
-
-            if DEFAULT_PORT not in self.attempted_ports:
-                # First, attempt the default port before anything else.
-                self._host = f"127.0.0.1:{DEFAULT_PORT}"
-
-            # Pick a random port
-            port = random.randint(EPHEMERAL_PORTS_START, EPHEMERAL_PORTS_END)
-            max_attempts = 25
-            attempts = 0
-            while port in self.attempted_ports:
-                port = random.randint(EPHEMERAL_PORTS_START, EPHEMERAL_PORTS_END)
-                attempts += 1
-                if attempts == max_attempts:
-                    ports_str = ", ".join([str(p) for p in self.attempted_ports])
-                    raise FoundryProviderError(
-                        f"Unable to find an available port. Ports tried: {ports_str}"
-                    )
-
-            self.attempted_ports.append(port)
-            self._host = f"http://127.0.0.1:{port}"
+            # NOTE: The port is leased only when starting a process (see `start()`),
+            #   as pooled and daemon processes already have theirs.
+            pass
 
         elif self._host is not None and ":" in self._host and self._port is not None:
             # Append the one and only port to the attempted ports list, for honest keeping.
@@ -443,17 +799,185 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
         else:
             self._host = f"http://127.0.0.1:{DEFAULT_PORT}"
 
-        if "127.0.0.1" in self._host or "localhost" in self._host:
+        if use_random_port or "127.0.0.1" in self._host or "localhost" in self._host:
             # Start local process
-            self.start()
+            self.start(timeout=self.settings.process_start_timeout)
 
         elif not self.is_connected:
             raise FoundryProviderError(f"Failed to connect to Anvil node at '{self._clean_uri}'.")
 
+    def start(self, timeout: int = 20):
+        """
+        Start the Anvil process and wait for its RPC to be ready.
+        Unlike the base implementation, readiness is detected by tailing the
+        process output and probing the RPC port rather than by repeatedly
+        building Web3 clients, and the timeout is a wall-clock deadline.
+        """
+        if self.is_connected:
+            logger.info(f"Connecting to existing '{self.process_name}' process.")
+            self.process = None  # Not managing the process.
+            return
+
+        elif not self.allow_start:
+            raise ProviderError("Process not started and cannot connect to existing process.")
+
+        elif self.background or not self._can_share_process:
+            # Starting a detached process, or one depending on this one
+            # (such as on its upstream proxy); never use shared ones.
+            pass
+
+        elif (
+            self.settings.use_daemon
+            and self._has_daemon
+            and (member := self._daemon.claim()) is not None
+        ):
+            # Attach to a daemon started via `ape foundry start`.
+            self._use_pool_member(self._daemon, member)
+            return
+
+        elif self.settings.process_pool_size > 0:
+            pool = get_pool(
+                self.config_manager.DATA_FOLDER / self.name / "pool",
+                self.build_command(),
+                self.settings.process_pool_size,
+                timeout=timeout,
+                ports=self._port_registry,
+            )
+            self._use_pool_member(pool, pool.lease())
+            return
+
+        if self._host == "auto":
+            # Lease a port no other session is using, checked by binding it.
+            port = self._port_registry.lease(exclude=self.attempted_ports)
+            self._port_lease = port
+            self.attempted_ports.append(port)
+            self._host = f"http://127.0.0.1:{port}"
+
+        logger.info(f"Starting '{self.process_name}' process.")
+        pre_exec_fn = _linux_set_death_signal if platform.uname().system == "Linux" else None
+        self.stderr_queue = JoinableQueue()
+        self.stdout_queue = JoinableQueue()
+        capture_output = not self.background and logger.level <= LogLevel.DEBUG
+        out_file = PIPE if capture_output else DEVNULL
+        cmd = self.build_command()
+        if (ipc_path := self.ipc_path) is not None and self._extend_if_supported(
+            cmd, "--ipc", f"{ipc_path}"
+        ):
+            # Remove any socket left behind by a killed process.
+            ipc_path.unlink(missing_ok=True)
+            self._ipc_path = ipc_path
+
+        # NOTE: Begin tailing before spawning so no output is missed.
+        probe = AnvilReadinessProbe(
+            self._port or DEFAULT_PORT,
+            host=URL(self.uri).host or "127.0.0.1",
+            log_path=self.stdout_logs_path if capture_output else None,
+        )
+        self.process = popen(cmd, preexec_fn=pre_exec_fn, stdout=out_file, stderr=out_file)
+        probe.process = self.process
+        spawn(self.produce_stdout_queue)
+        spawn(self.produce_stderr_queue)
+        spawn(self.consume_stdout_queue)
+        spawn(self.consume_stderr_queue)
+
+        # Cache the process so we can manage it even if lost.
+        self.network_manager.running_nodes.cache_provider(self)
+
+        deadline = time.monotonic() + timeout
+        while probe.wait(deadline - time.monotonic()):
+            self._set_web3()
+            if self._web3 is not None:
+                return
+
+            elif time.monotonic() >= deadline:
+                break
+
+            # Listening but not yet serving RPC.
+            time.sleep(0.01)
+
+        raise RPCTimeoutError(self, seconds=timeout)
+
+    @property
+    def _can_share_process(self) -> bool:
+        return True
+
+    def _use_pool_member(self, pool: AnvilPool, member: PoolMember):
+        if self._port_lease is not None:
+            # The member has its own port.
+            self._port_registry.release(self._port_lease)
+            self._port_lease = None
+
+        self._pool = pool
+        self._pool_member = member
+        logger.info(f"Using running '{self.process_name}' process at '{member.uri}'.")
+        self._host = member.uri
+        self._set_web3()
+        if self._web3 is None:
+            raise FoundrySubprocessError(f"Failed to connect to '{self.process_name}' process.")
+
+    @property
+    def _daemon_path(self) -> Path:
+        return self.config_manager.DATA_FOLDER / self.name / "daemon"
+
+    @property
+    def _has_daemon(self) -> bool:
+        # perf: Most sessions have no daemon, so avoid building the command
+        #   and locking and reclaiming pool files to find one.
+        return any(self._daemon_path.glob("*/*/*.json"))
+
+    @property
+    def _daemon(self) -> AnvilPool:
+        return AnvilPool(
+            self._daemon_path,
+            self.build_command(),
+            1,
+            timeout=self.settings.process_start_timeout,
+            ports=self._port_registry,
+            persistent=True,
+        )
+
+    def start_daemon(self) -> list[PoolMember]:
+        """
+        Start a long-lived Anvil process using this provider's command arguments,
+        if one is not already running. Later sessions using the same arguments
+        attach to the daemon (when ``use_daemon`` is enabled) and reset it when
+        disconnecting, rather than starting and stopping their own process.
+
+        Returns:
+            list[:class:`~ape_foundry.pool.PoolMember`]: The running daemon(s).
+        """
+        daemon = self._daemon
+        daemon.fill()
+        return daemon.members()
+
+    def stop_daemon(self) -> list[PoolMember]:
+        """
+        Stop the daemon(s) started via
+        :meth:`~ape_foundry.provider.FoundryProvider.start_daemon`.
+
+        Returns:
+            list[:class:`~ape_foundry.pool.PoolMember`]: The stopped daemon(s).
+        """
+        daemon = self._daemon
+        members = daemon.members()
+        daemon.shutdown(force=True)
+        return members
+
     def disconnect(self):
+        if self._pool is not None and self._pool_member is not None:
+            # Reset the node and return it to the pool rather than stopping it.
+            self._pool.release(self._pool_member)
+            self._pool_member = None
+
+        if self._port_lease is not None:
+            self._port_registry.release(self._port_lease)
+            self._port_lease = None
+
         self._web3 = None
         self._host = None
         super().disconnect()
+        self._ipc_path = None
+        self._clear_trace_cache()
         self._disconnected = True
 
     def build_command(self) -> list[str]:
@@ -483,7 +1007,7 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
             cmd.extend(("--block-time", f"{self.settings.block_time}"))
 
         if self.settings.disable_block_gas_limit:
-            cmd.append("--disable-block-gas-limit")
+            self._extend_if_supported(cmd, "--disable-block-gas-limit")
 
         if evm_version := self.evm_version:
             cmd.extend(("--hardfork", evm_version))
@@ -491,11 +1015,88 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
         # Optimism-based networks are different; Anvil provides a flag to make
         # testing more like the real network(s).
         if self.use_optimism:
-            cmd.append("--optimism")
+            self._extend_if_supported(cmd, "--optimism")
 
         return cmd
 
+    def _extend_if_supported(self, cmd: list[str], flag: str, *values: str) -> bool:
+        if self.anvil_binary.supports(flag):
+            cmd.extend((flag, *values))
+            return True
+
+        logger.warning(
+            f"Installed Anvil ({self.anvil_binary.version}) does not support '{flag}'. "
+            "Try upgrading Foundry."
+        )
+        return False
+
+    @contextmanager
+    def batch_requests(self, size: int = DEFAULT_BATCH_SIZE) -> Iterator[RequestBatch]:
+        """
+        Queue state-setting requests, from ``set_balance()``, ``set_storage()``,
+        ``set_code()``, ``set_timestamp()``, ``unlock_account()`` and ``relock_account()``,
+        and send them as JSON-RPC batches when the context exits, rather than in a round
+        trip each. Other requests are still sent immediately, so they do not see the
+        queued changes until the batch is sent (see ``RequestBatch.flush()``).
+
+        Usage example::
+
+            with provider.batch_requests():
+                for account in accounts:
+                    provider.set_balance(account.address, "1000 ETH")
+
+        Args:
+            size (int): The maximum number of requests per batch.
+              Defaults to ``500``.
+
+        Raises:
+            :class:`~ape_foundry.exceptions.FoundryBatchError`: When any of the
+              requests failed, with the originating request of each error.
+
+        Returns:
+            Iterator[:class:`~ape_foundry.batch.RequestBatch`]
+        """
+        if self._batch is not None:
+            # Nested; join the outer batch.
+            yield self._batch
+            return
+
+        self._batch = RequestBatch(self._make_batch_request, size=size)
+        try:
+            yield self._batch
+            self._batch.flush()
+        finally:
+            self._batch = None
+
+    def _make_state_request(self, rpc: str, parameters: list) -> Any:
+        if self._batch is not None:
+            return self._batch.add(rpc, parameters)
+
+        return self.make_request(rpc, parameters)
+
+    def _make_batch_request(self, requests: list[tuple[str, list]]) -> list:
+        web3_provider = self.web3.provider
+        if not hasattr(web3_provider, "make_batch_request"):
+            # web3<7 does not support batching.
+            return [web3_provider.make_request(RPCEndpoint(m), p) for m, p in requests]
+
+        batch = [(RPCEndpoint(method), params) for method, params in requests]
+        try:
+            responses = web3_provider.make_batch_request(batch)
+        except OSError:
+            self._web3_host = None
+            raise
+
+        if isinstance(responses, dict):
+            # The whole batch was rejected.
+            return [responses] * len(requests)
+
+        return list(responses)
+
     def set_balance(self, account: "AddressType", amount: Union[int, float, str, bytes]):
+        self._make_state_request("anvil_setBalance", [account, self._convert_balance(amount)])
+
+    def _convert_balance(self, amount: Union[int, float, str, bytes]) -> str:
         is_str = isinstance(amount, str)
         is_key_word = is_str and " " in amount  # type: ignore
         _is_hex = is_str and not is_key_word and amount.startswith("0x")  # type: ignore
@@ -513,15 +1114,13 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
         else:
             amount_hex_str = str(amount)
 
-        self.make_request("anvil_setBalance", [account, amount_hex_str])
+        return amount_hex_str
 
     def set_timestamp(self, new_timestamp: int):
-        self.make_request("evm_setNextBlockTimestamp", [new_timestamp])
+        self._make_state_request("evm_setNextBlockTimestamp", [new_timestamp])
 
     def mine(self, num_blocks: int = 1):
-        # NOTE: Request fails when given numbers with any left padded 0s.
-        num_blocks_arg = f"0x{HexBytes(num_blocks).hex().replace('0x', '').lstrip('0')}"
-        self.make_request("anvil_mine", [num_blocks_arg])
+        self.make_request("anvil_mine", [to_quantity(num_blocks)])
 
     def snapshot(self) -> str:
         return self.make_request("evm_snapshot", [])
@@ -529,14 +1128,23 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
     def restore(self, snapshot_id: "SnapshotID") -> bool:
         snapshot_id = to_hex(snapshot_id) if isinstance(snapshot_id, int) else snapshot_id
         result = self.make_request("evm_revert", [snapshot_id])
+
+        # NOTE: Reverted transactions' hashes may be mined again, with different traces.
+        self._clear_trace_cache()
         return result is True
 
     def unlock_account(self, address: "AddressType") -> bool:
-        self.make_request("anvil_impersonateAccount", [address])
+        self._make_state_request("anvil_impersonateAccount", [address])
+        if self._pool_member is not None:
+            # Stopped when returning the node to the pool.
+            self._pool_member.impersonated.append(address)
+
         return True
 
     def relock_account(self, address: "AddressType"):
-        self.make_request("anvil_stopImpersonatingAccount", [address])
+        self._make_state_request("anvil_stopImpersonatingAccount", [address])
+        if self._pool_member is not None and address in self._pool_member.impersonated:
+            self._pool_member.impersonated.remove(address)
 
     def get_balance(self, address: "AddressType", block_id: Optional["BlockID"] = None) -> int:
         if result := self.make_request("eth_getBalance", [address, block_id]):
@@ -545,8 +1153,134 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
         raise FoundryProviderError(f"Failed to get balance for account '{address}'.")
 
     def get_transaction_trace(self, transaction_hash: str, **kwargs) -> TraceAPI:
+        if "call_trace_approach" not in kwargs:
+            kwargs["call_trace_approach"] = self.call_trace_approach
+
         return _get_transaction_trace(transaction_hash, **kwargs)
 
+    def get_transaction_traces(
+        self, transaction_hashes: Iterable[str], **kwargs
+    ) -> list[AnvilTransactionTrace]:
+        """
+        Get the traces of many transactions, fetching the ``trace_transaction`` data
+        of those not already cached in JSON-RPC batches, rather than in a round trip
+        per transaction.
+
+        Args:
+            transaction_hashes (Iterable[str]): The transactions to trace.
+            **kwargs: Additional trace kwargs, such as ``call_trace_approach``.
+
+        Returns:
+            list[:class:`~ape_foundry.trace.AnvilTransactionTrace`]
+        """
+        traces = [
+            cast(AnvilTransactionTrace, self.get_transaction_trace(txn_hash, **kwargs))
+            for txn_hash in transaction_hashes
+        ]
+        batch = RequestBatch(self._make_batch_request)
+        requests = {}
+        for trace in traces:
+            if trace._trace_data is not None:
+                continue
+
+            elif (data := trace._get_cached_data("trace_transaction")) is not None:
+                trace._trace_data = data
+
+            else:
+                requests[id(trace)] = batch.add("trace_transaction", [trace.transaction_hash])
+
+        try:
+            batch.flush()
+        except FoundryBatchError as err:
+            # NOTE: Failed traces are fetched again, and raise, when read.
+            logger.debug(f"Failed to fetch some traces: {err}")
+
+        for trace in traces:
+            if (request := requests.get(id(trace))) is not None and request.error is None:
+                trace._trace_data = request.result
+                trace._set_cached_data("trace_transaction", request.result)
+
+        return traces
+
+    def trace_blocks(
+        self, start_block: int, stop_block: Optional[int] = None, **kwargs
+    ) -> list[AnvilTransactionTrace]:
+        """
+        Get the traces of all transactions in a range of blocks, using ``trace_block``
+        requests sent in JSON-RPC batches rather than a round trip per transaction.
+        Their data is cached, so later traces of the same transactions, such as for
+        gas or coverage reports, make no requests.
+
+        Args:
+            start_block (int): The first block.
+            stop_block (Optional[int]): The last block (inclusive).
+              Defaults to the latest block.
+            **kwargs: Additional trace kwargs, such as ``call_trace_approach``.
+
+        Returns:
+            list[:class:`~ape_foundry.trace.AnvilTransactionTrace`]: In the order
+            the transactions were mined.
+        """
+        if stop_block is None:
+            stop_block = self.get_block("latest").number or 0
+
+        traces = []
+        for transaction_hash, data in self._trace_block_range(start_block, stop_block).items():
+            trace = cast(
+                AnvilTransactionTrace, self.get_transaction_trace(transaction_hash, **kwargs)
+            )
+            trace._trace_data = data
+            traces.append(trace)
+
+        return traces
+
+    def _trace_block_range(self, start_block: int, stop_block: int) -> dict[str, list[dict]]:
+        batch = RequestBatch(self._make_batch_request)
+        requests = [
+            batch.add("trace_block", [to_hex(n)]) for n in range(start_block, stop_block + 1)
+        ]
+        try:
+            batch.flush()
+        except FoundryBatchError as err:
+            # NOTE: Such as for blocks that do not exist (yet).
+            logger.debug(f"Failed to trace some blocks: {err}")
+
+        traces_by_hash: dict[str, list[dict]] = {}
+        for request in requests:
+            for call in request.result or []:
+                if transaction_hash := call.get("transactionHash"):
+                    traces_by_hash.setdefault(transaction_hash, []).append(call)
+
+        if cache := self.trace_cache:
+            identity = self.trace_cache_identity
+            for transaction_hash, data in traces_by_hash.items():
+                cache.set(
+                    get_trace_cache_key(identity, "trace_transaction", transaction_hash), data
+                )
+
+        return traces_by_hash
+
+    def _prefetch_block_traces(self, transaction_hash: str) -> Optional[list[dict]]:
+        if (num_blocks := self.settings.trace_prefetch_blocks) <= 0 or self.trace_cache is None:
+            return None
+
+        try:
+            block_number = self.chain_manager.get_receipt(transaction_hash).block_number
+        except Exception as err:  # noqa: BLE001
+            logger.debug(f"Unable to prefetch traces: {err}")
+            return None
+
+        # NOTE: Tracing blocks not mined by the node, such as a fork's upstream
+        #   blocks, re-executes them all, so only the transaction is traced.
+        if block_number < self._first_local_block:
+            return None
+
+        stop_block = min(block_number + num_blocks, self.chain_manager.blocks.height)
+        traces_by_hash = self._trace_block_range(block_number, stop_block)
+        return next(
+            (v for k, v in traces_by_hash.items() if k.lower() == transaction_hash.lower()), None
+        )
+
     def get_virtual_machine_error(self, exception: Exception, **kwargs) -> VirtualMachineError:
         if not exception.args:
             return VirtualMachineError(base_err=exception, **kwargs)
@@ -579,8 +1313,10 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
         if message.lower() == "execution reverted":
             message = TransactionError.DEFAULT_MESSAGE
             if isinstance(exception, Web3ContractLogicError):
+                # NOTE: The error has no revert data, so the transaction must be traced.
                 if custom_msg := self._extract_custom_error(**kwargs):
                     exception.message = custom_msg
+
             return self._handle_execution_reverted(exception, revert_message=message, **kwargs)
 
         if "Transaction ran out of gas" in message or "OutOfGas" in message:
@@ -596,6 +1332,18 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
         # Handle custom errors
         if isinstance(exception, ContractCustomError):
             message = TransactionError.DEFAULT_MESSAGE if message in ("", None, "0x") else message
+            if (revert_data := get_revert_data(exception)) is not None and (
+                decoded := self._decode_custom_error(revert_data, **kwargs)
+            ):
+                # perf: Ape only finds errors not declared by the receiver by tracing
+                #   the transaction, so decode them from the revert data instead.
+                message = decoded
+
+            return self._handle_execution_reverted(exception, revert_message=message, **kwargs)
+
+        # Handle panics, such as failed assertions and arithmetic errors.
+        if isinstance(exception, ContractPanicError):
+            # NOTE: Web3 already decoded the panic code, so nothing needs tracing.
             return self._handle_execution_reverted(exception, revert_message=message, **kwargs)
 
         return VirtualMachineError(message, **kwargs)
@@ -642,36 +1390,146 @@ class FoundryProvider(SubprocessProvider, Web3Provider, TestProviderAPI):
             except Exception:
                 pass
 
-        if trace is not None and (revert_msg := trace.revert_message):
+        if trace is None:
+            return ""
+
+        # perf: Getting the data the top-level call reverted with is cheap, so only
+        #   trace the whole transaction when the revert data is missing.
+        if isinstance(trace, AnvilTransactionTrace) and (revert_data := trace.get_revert_data()):
+            return self._decode_revert_data(revert_data, **kwargs)
+
+        elif revert_msg := trace.revert_message:
             return revert_msg
 
         return ""
 
-    def set_block_gas_limit(self, gas_limit: int) -> bool:
-        return self.make_request("evm_setBlockGasLimit", [hex(gas_limit)]) is True
+    def _decode_custom_error(self, revert_data: bytes, **kwargs) -> Optional[str]:
+        # Decodes errors not declared by the receiver; those it declares are
+        # turned into its custom error classes by Ape, without tracing.
+        if (address := _get_receiver(**kwargs)) is not None:
+            try:
+                contract_type = self.chain_manager.contracts.get(address)
+            except Exception as err:  # noqa: BLE001
+                logger.debug(f"Unable to get contract type for decoding revert data: {err}")
+                contract_type = None
 
-    def set_code(self, address: "AddressType", code: "ContractCode") -> bool:
-        if isinstance(code, bytes):
-            code = to_hex(code)
+            if contract_type is not None and revert_data[:4] in contract_type.errors:
+                return None
+
+        return self.error_selector_index.decode(revert_data)
+
+    def _decode_revert_data(self, revert_data: bytes, **kwargs) -> str:
+        index = self.error_selector_index
+        if revert_data[:4] not in index and (address := _get_receiver(**kwargs)):
+            # Not a project contract's error, e.g. when forking; index the receiver's.
+            try:
+                contract_type = self.chain_manager.contracts.get(address)
+            except Exception as err:  # noqa: BLE001
+                logger.debug(f"Unable to get contract type for decoding revert data: {err}")
+                contract_type = None
+
+            if contract_type is not None:
+                index.add(contract_type)
+
+        return index.decode(revert_data) or to_hex(revert_data)
+
+    def dump_state(self) -> HexBytes:
+        """
+        Get the complete state of the chain, as compressed bytes.
+        """
+        return HexBytes(self.make_request("anvil_dumpState", []))
+
+    def load_state(self, state: Union[bytes, str]) -> bool:
+        """
+        Merge a state produced by :meth:`~ape_foundry.provider.FoundryProvider.dump_state`
+        into the chain.
+        """
+        state_hex = state if isinstance(state, str) else to_hex(state)
+        return self.make_request("anvil_loadState", [state_hex]) is True
+
+    @property
+    def state_template_key(self) -> str:
+        """
+        Identifies the compiled contracts and node config a state template is valid for.
+        """
+        return state_key(
+            (self.local_project.manifest.contract_types or {}).values(),
+            self.network_choice,
+            command_key(_without_option(self.build_command(), "--fork-url")),
+            self.settings.model_dump_json(exclude={"host", "state_template"}),
+            *self._state_template_key_parts,
+        )
+
+    @property
+    def _state_template_key_parts(self) -> list[str]:
+        # Stable inputs of the state, in place of command arguments that
+        # change between sessions, such as the fork URL.
+        return []
+
+    @property
+    def _state_templates(self) -> StateTemplates:
+        return StateTemplates(self.config_manager.DATA_FOLDER / self.name / "states")
+
+    def save_state_template(self, name: str = "default") -> Path:
+        """
+        Dump the chain state into a template that later sessions can load
+        instead of repeating the same setup.
+
+        Args:
+            name (str): The name of the template.
+
+        Returns:
+            Path: The template file.
+        """
+        return self._state_templates.save(name, self.state_template_key, self.dump_state())
+
+    def load_state_template(self, name: str = "default") -> bool:
+        """
+        Load a template saved via
+        :meth:`~ape_foundry.provider.FoundryProvider.save_state_template`.
+
+        Args:
+            name (str): The name of the template.
+
+        Returns:
+            bool: ``True`` if a valid template existed and was loaded.
+        """
+        if (state := self._state_templates.load(name, self.state_template_key)) is None:
+            return False
+
+        return self.load_state(state)
+
+    @contextmanager
+    def state_template(self, name: str = "default") -> Iterator[bool]:
+        """
+        Load the named state template, if it exists. Else, save one
+        after the setup within the context completes, for example::
+
+            with provider.state_template("fixtures") as loaded:
+                if not loaded:
+                    deploy_fixtures()
 
-        elif isinstance(code, str) and not is_0x_prefixed(code):
-            code = add_0x_prefix(HexStr(code))
+        Args:
+            name (str): The name of the template.
 
-        elif not is_hex(code):
-            raise ValueError(f"Value {code} is not convertible to hex")
+        Returns:
+            Iterator[bool]: Whether the template was loaded.
+        """
+        loaded = self.load_state_template(name)
+        yield loaded
+        if not loaded:
+            self.save_state_template(name)
 
-        self.make_request("anvil_setCode", [address, code])
+    def set_block_gas_limit(self, gas_limit: int) -> bool:
+        return self.make_request("evm_setBlockGasLimit", [hex(gas_limit)]) is True
+
+    def set_code(self, address: "AddressType", code: "ContractCode") -> bool:
+        self._make_state_request("anvil_setCode", [address, convert_code(code)])
+        self._method_abis = {k: v for k, v in self._method_abis.items() if k[0] != address.lower()}
         return True
 
     def set_storage(self, address: "AddressType", slot: int, value: HexBytes):
-        self.make_request(
-            "anvil_setStorageAt",
-            [
-                address,
-                to_hex(HexBytes32.__eth_pydantic_validate__(slot)),
-                to_hex(HexBytes32.__eth_pydantic_validate__(value)),
-            ],
-        )
+        self._make_state_request("anvil_setStorageAt", get_storage_params(address, slot, value))
 
 
 class FoundryForkProvider(FoundryProvider):
@@ -684,6 +1542,10 @@ class FoundryForkProvider(FoundryProvider):
     to use as your archive node.
     """
 
+    _upstream_proxy: Optional[UpstreamProxy] = None
+    _reset_block_number: Optional[int] = None
+    """The block the fork was last reset to, if any."""
+
     @model_validator(mode="before")
     @classmethod
     def set_upstream_provider(cls, value):
@@ -706,6 +1568,24 @@ class FoundryForkProvider(FoundryProvider):
 
         return value
 
+    @property
+    def trace_cache_identity(self) -> str:
+        return f"{super().trace_cache_identity}:{self.fork_block_number}"
+
+    @property
+    def _first_local_block(self) -> int:
+        return self._get_fork_block_number() + 1
+
+    @property
+    def _state_template_key_parts(self) -> list[str]:
+        # NOTE: The fork URL may be a local proxy's, on a new port each session.
+        upstream_network = self.forked_network.upstream_network
+        return [
+            f"{upstream_network.ecosystem.name}:{upstream_network.name}",
+            f"{upstream_network.chain_id}",
+            f"{self._get_fork_block_number()}",
+        ]
+
     @property
     def fork_block_number(self) -> Optional[int]:
         return self._fork_config.block_number
@@ -775,9 +1655,267 @@ class FoundryForkProvider(FoundryProvider):
     def fork_url(self) -> str:
         return self.forked_network.upstream_provider.connection_str
 
+    @property
+    def upstream_proxy(self) -> Optional[UpstreamProxy]:
+        """
+        The local proxy between Anvil and the upstream provider, started when the
+        fork's ``upstream_mode`` is ``"record"`` or ``"replay"`` (see
+        :class:`~ape_foundry.provider.FoundryForkConfig`).
+        """
+        mode = self._fork_config.upstream_mode
+        if self._upstream_proxy is None and mode in ("record", "replay"):
+            # NOTE: Replaying never touches the upstream provider, e.g. for its API key.
+            upstream_uri = None if mode == "replay" else self.fork_url
+            proxy = UpstreamProxy(
+                UpstreamStore(self.upstream_store_path),
+                upstream_uri=upstream_uri,
+                mode=mode,
+                timeout=self.timeout,
+                rate_limit=self._fork_config.upstream_rate_limit,
+            )
+            proxy.start()
+            self._upstream_proxy = proxy
+
+        return self._upstream_proxy
+
+    @property
+    def upstream_store_path(self) -> Path:
+        """
+        The file the upstream proxy records responses in.
+        """
+        if path := self._fork_config.upstream_store:
+            return path if path.is_absolute() else self.local_project.path / path
+
+        upstream_network = self.forked_network.upstream_network
+        name = f"{upstream_network.ecosystem.name}-{upstream_network.name}.sqlite"
+        return self.config_manager.DATA_FOLDER / self.name / "upstream" / name
+
+    @property
+    def _fork_rpc_url(self) -> str:
+        # The URL Anvil forks from.
+        if (proxy := self.upstream_proxy) is not None:
+            return proxy.uri
+
+        elif self._fork_config.upstream_mode == "cache":
+            return get_shared_proxy_uri(
+                self.config_manager.DATA_FOLDER / self.name / "proxies",
+                self.fork_url,
+                self.upstream_store_path,
+                rate_limit=self._fork_config.upstream_rate_limit,
+                timeout=self.timeout,
+            )
+
+        return self.fork_url
+
+    @property
+    def _can_share_process(self) -> bool:
+        # NOTE: Upstream proxies only live as long as the processes using them.
+        return self._fork_config.upstream_mode is None
+
     def connect(self):
         super().connect()
 
+        if (upstream_genesis_hash := self._get_upstream_genesis_hash()) is not None:
+            genesis_hash = self._genesis_hash or to_hex(self.get_block(0).hash)
+            if genesis_hash.lower() != upstream_genesis_hash.lower():
+                logger.warning(
+                    "Upstream network has mismatching genesis block. "
+                    "This could be an issue with foundry."
+                )
+
+    def _set_up_started_node(self):
+        if self._fork_config.prefetch:
+            # NOTE: Before loading state templates, which may change the same accounts.
+            try:
+                self.prefetch_state()
+            except Exception as err:  # noqa: BLE001
+                # NOTE: Anvil still fetches the accounts when used.
+                logger.warning(f"Unable to prefetch fork state: {err}")
+
+        super()._set_up_started_node()
+
+    def prefetch_state(
+        self,
+        targets: Optional[Iterable[Union[PrefetchTarget, dict, str]]] = None,
+        batch_size: int = DEFAULT_PREFETCH_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_PREFETCH_CONCURRENCY,
+    ) -> list[AccountState]:
+        """
+        Fetch the balances, nonces, code and storage slots of accounts at the fork
+        block from the upstream provider, in concurrent batches, and set them in the
+        fork. Executing transactions then never waits on reading them from the
+        upstream one at a time.
+
+        Args:
+            targets (Optional[Iterable]): The accounts, as
+              :class:`~ape_foundry.prefetch.PrefetchTarget` objects, dicts or addresses.
+              Defaults to the fork's ``prefetch`` config.
+            batch_size (int): The maximum number of upstream requests per batch.
+            max_concurrency (int): The maximum number of batches in flight at once.
+
+        Returns:
+            list[:class:`~ape_foundry.prefetch.AccountState`]: The prefetched state.
+        """
+        targets = self._fork_config.prefetch if targets is None else targets
+        session = create_session(pool_size=max_concurrency)
+        fork_url = self._fork_rpc_url
+
+        def send(requests: list[tuple[str, list]]) -> list[dict]:
+            payload = [
+                {"jsonrpc": "2.0", "id": i, "method": m, "params": p}
+                for i, (m, p) in enumerate(requests)
+            ]
+            response = session.post(fork_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            if isinstance(responses := response.json(), dict):
+                # The whole batch was rejected.
+                return [responses] * len(requests)
+
+            return sorted(responses, key=lambda r: r.get("id", -1))
+
+        try:
+            states = fetch_state(
+                send,
+                targets,
+                self._get_fork_block_number(),
+                batch_size=batch_size,
+                max_concurrency=max_concurrency,
+            )
+        finally:
+            session.close()
+
+        with self.batch_requests():
+            for state in states:
+                self.set_balance(state.address, state.balance)
+                self._make_state_request("anvil_setNonce", [state.address, hex(state.nonce)])
+                if state.code != "0x":
+                    self.set_code(state.address, state.code)
+
+                for slot, value in state.storage.items():
+                    self.set_storage(state.address, slot, HexBytes(value))
+
+        return states
+
+    def _get_fork_block_number(self) -> int:
+        if self._reset_block_number is not None:
+            return self._reset_block_number
+
+        elif self.fork_block_number is not None:
+            return self.fork_block_number
+
+        try:
+            return int(self.make_request("anvil_nodeInfo", [])["forkConfig"]["forkBlockNumber"])
+        except Exception as err:  # noqa: BLE001
+            logger.debug(f"Unable to get fork block number: {err}")
+            return self.chain_manager.blocks.height
+
+    @property
+    def _fork_states(self) -> StateTemplates:
+        return StateTemplates(self.config_manager.DATA_FOLDER / self.name / "fork_states")
+
+    def _get_fork_state_name(self, block_number: int) -> str:
+        upstream_network = self.forked_network.upstream_network
+        return f"{upstream_network.ecosystem.name}-{upstream_network.name}-{block_number}"
+
+    def _get_fork_state_key(self, block_number: int) -> str:
+        # NOTE: Upstream state at a block never changes, but the fork and node
+        #   config, such as the test accounts or what is prefetched, may.
+        upstream_network = self.forked_network.upstream_network
+        return state_key(
+            (),
+            f"{upstream_network.ecosystem.name}:{upstream_network.name}",
+            f"{upstream_network.chain_id}",
+            f"{block_number}",
+            self._fork_config.model_dump_json(),
+            self.settings.model_dump_json(exclude={"host", "state_template", "fork"}),
+            self.mnemonic,
+            f"{self.number_of_accounts}",
+            f"{self.initial_balance}",
+        )
+
+    def save_fork_state(self) -> Path:
+        """
+        Dump the chain state, such as after warming up the accounts used at the fork
+        block (see :meth:`~ape_foundry.provider.FoundryForkProvider.prefetch_state`),
+        so later resetting to the same block with ``load_saved_state=True`` loads it
+        rather than fetching the accounts from the upstream provider again (see
+        :meth:`~ape_foundry.provider.FoundryForkProvider.reset_fork`).
+
+        Returns:
+            Path: The state file.
+        """
+        block_number = self._get_fork_block_number()
+        name = self._get_fork_state_name(block_number)
+        key = self._get_fork_state_key(block_number)
+        return self._fork_states.save(name, key, self.dump_state())
+
+    def iter_fork_blocks(
+        self, block_numbers: Iterable[int], warmup: Optional[Callable[[], Any]] = None
+    ) -> Iterator[int]:
+        """
+        Reset the fork to each block in turn, such as for backtesting. The first time
+        a block is visited, the fork is warmed up, by prefetching the fork's ``prefetch``
+        config and calling ``warmup``, and its state saved (see
+        :meth:`~ape_foundry.provider.FoundryForkProvider.save_fork_state`). Later visits,
+        including in later sessions, load the saved state instead.
+
+        Usage example::
+
+            for block_number in provider.iter_fork_blocks(range(20_000_000, 20_001_000, 100)):
+                run_backtest(block_number)
+
+        Args:
+            block_numbers (Iterable[int]): The blocks to fork.
+            warmup (Optional[Callable]): Touches the accounts used at each block,
+              e.g. via :meth:`~ape_foundry.provider.FoundryForkProvider.prefetch_state`.
+
+        Returns:
+            Iterator[int]: The block numbers, each once the fork is reset to it.
+        """
+        for block_number in block_numbers:
+            _, loaded = self._reset_fork(block_number, load_saved_state=True)
+            if not loaded:
+                if self._fork_config.prefetch:
+                    self.prefetch_state()
+
+                if warmup is not None:
+                    warmup()
+
+                self.save_fork_state()
+
+            yield block_number
+
+    def disconnect(self):
+        super().disconnect()
+        self._reset_block_number = None
+        if (proxy := self._upstream_proxy) is not None:
+            self._upstream_proxy = None
+            proxy.stop()
+
+    def _get_upstream_genesis_hash(self) -> Optional[str]:
+        upstream_network = self.forked_network.upstream_network
+        cache_key = (
+            f"genesis:{upstream_network.ecosystem.name}:{upstream_network.name}:"
+            f"{upstream_network.chain_id}"
+        )
+        if (proxy := self.upstream_proxy) is not None:
+            # NOTE: Always requested, so recordings work without the network cache.
+            try:
+                genesis = proxy.request("eth_getBlockByNumber", ["0x0", False])
+            except FoundryProviderError as err:
+                logger.error(f"Unable to get genesis block for upstream provider: {err}")
+                return None
+
+            if not genesis or not (upstream_genesis_hash := genesis.get("hash")):
+                return None
+
+            self._network_cache.set(cache_key, upstream_genesis_hash)
+            return upstream_genesis_hash
+
+        elif cached_hash := self._network_cache.get(cache_key):
+            # perf: Genesis blocks never change, so only ever look them up once.
+            return cached_hash
+
         with self.forked_network.use_upstream_provider() as upstream_provider:
             upstream_genesis_block = None
             try:
@@ -797,25 +1935,24 @@ class FoundryForkProvider(FoundryProvider):
             except Exception:
                 logger.error("Unable to get genesis block for upstream provider.")
 
-        if upstream_genesis_block is not None:
-            genesis_block = self.get_block(0)
-            if genesis_block.hash != upstream_genesis_block.hash:
-                logger.warning(
-                    "Upstream network has mismatching genesis block. "
-                    "This could be an issue with foundry."
-                )
+        if upstream_genesis_block is None or upstream_genesis_block.hash is None:
+            return None
+
+        upstream_genesis_hash = to_hex(upstream_genesis_block.hash)
+        self._network_cache.set(cache_key, upstream_genesis_hash)
+        return upstream_genesis_hash
 
     def build_command(self) -> list[str]:
-        if not self.fork_url:
+        if not (fork_url := self._fork_rpc_url):
             raise FoundryProviderError("Upstream provider does not have a ``connection_str``.")
 
-        if self.fork_url.replace("localhost", "127.0.0.1").replace("http://", "") == self.uri:
+        if fork_url.replace("localhost", "127.0.0.1").replace("http://", "") == self.uri:
             raise FoundryProviderError(
                 "Invalid upstream-fork URL. Can't be same as local anvil node."
             )
 
         cmd = super().build_command()
-        cmd.extend(("--fork-url", self.fork_url))
+        cmd.extend(("--fork-url", fork_url))
         if self.fork_block_number is not None:
             cmd.extend(("--fork-block-number", str(self.fork_block_number)))
 
@@ -824,15 +1961,63 @@ class FoundryForkProvider(FoundryProvider):
 
         return cmd
 
-    def reset_fork(self, block_number: Optional[int] = None):
-        forking_params: dict[str, Union[str, int]] = {"jsonRpcUrl": self.fork_url}
+    def reset_fork(self, block_number: Optional[int] = None, load_saved_state: bool = False):
+        """
+        Reset the fork to the given block, or the configured ``block_number``.
+
+        Args:
+            block_number (Optional[int]): The block to fork.
+            load_saved_state (bool): Load the state at the block saved via
+              :meth:`~ape_foundry.provider.FoundryForkProvider.save_fork_state`,
+              when there is one, rather than fetching it from the upstream provider
+              again. A saved state includes any changes made before saving it.
+              Defaults to ``False``.
+        """
+        result, _ = self._reset_fork(block_number, load_saved_state=load_saved_state)
+        return result
+
+    def _reset_fork(
+        self, block_number: Optional[int] = None, load_saved_state: bool = False
+    ) -> tuple[Any, bool]:
+        # Also returns whether a saved state was loaded.
+        forking_params: dict[str, Union[str, int]] = {"jsonRpcUrl": self._fork_rpc_url}
         block_number = block_number if block_number is not None else self.fork_block_number
         if block_number is not None:
             forking_params["blockNumber"] = block_number
 
         # # Rest the fork
         result = self.make_request("anvil_reset", [{"forking": forking_params}])
-        return result
+        self._reset_block_number = block_number
+        self._clear_trace_cache()
+        if not load_saved_state or block_number is None:
+            # NOTE: The latest block is never saved.
+            return result, False
+
+        name = self._get_fork_state_name(block_number)
+        key = self._get_fork_state_key(block_number)
+        if (state := self._fork_states.load(name, key)) is None:
+            return result, False
+
+        return result, self.load_state(state)
+
+
+def _without_option(command: list[str], option: str) -> list[str]:
+    if option not in command:
+        return command
+
+    start = command.index(option)
+    stop = start + 2  # The option and its value.
+    return command[:start] + command[stop:]
+
+
+def _get_receiver(**kwargs) -> Optional["AddressType"]:
+    if address := kwargs.get("contract_address"):
+        return address
+
+    elif (txn := kwargs.get("txn")) is not None:
+        return getattr(txn, "receiver", None)
+
+    return None
 
 
 def _get_transaction_trace(transaction_hash: str, **kwargs) -> TraceAPI:
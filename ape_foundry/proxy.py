@@ -0,0 +1,627 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from subprocess import DEVNULL
+from typing import Any, Literal, Optional, Union
+
+from ape.api.providers import popen
+from eth_utils import is_0x_prefixed, is_hex
+from pydantic import BaseModel
+from requests.exceptions import RequestException
+
+from ape_foundry.exceptions import FoundryProviderError, FoundrySubprocessError
+from ape_foundry.pool import find_free_port
+from ape_foundry.process import pid_is_alive, port_is_open
+from ape_foundry.session import create_session
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: shared proxies are still found, but starting one is not locked.
+    fcntl = None  # type: ignore
+
+ProxyMode = Literal["record", "replay", "cache"]
+
+UPSTREAM_URI_ENV = "APE_FOUNDRY_UPSTREAM_URI"
+"""
+The environment variable passing the upstream URI to shared proxy processes,
+so that API keys in it are not visible in the process list.
+"""
+
+BLOCK_PARAMETER_INDEX = {
+    "eth_getBalance": 1,
+    "eth_getCode": 1,
+    "eth_getTransactionCount": 1,
+    "eth_getStorageAt": 2,
+    "eth_getProof": 2,
+    "eth_call": 1,
+    "eth_createAccessList": 1,
+    "eth_estimateGas": 1,
+    "eth_feeHistory": 1,
+    "eth_getBlockByNumber": 0,
+    "eth_getBlockByHash": 0,
+    "eth_getBlockReceipts": 0,
+    "eth_getBlockTransactionCountByNumber": 0,
+    "eth_getBlockTransactionCountByHash": 0,
+    "eth_getTransactionByBlockNumberAndIndex": 0,
+    "eth_getTransactionByBlockHashAndIndex": 0,
+    "eth_getUncleCountByBlockNumber": 0,
+    "eth_getUncleCountByBlockHash": 0,
+    "eth_getUncleByBlockNumberAndIndex": 0,
+    "eth_getUncleByBlockHashAndIndex": 0,
+    "trace_block": 0,
+    "trace_replayBlockTransactions": 0,
+    "debug_traceBlockByNumber": 0,
+    "debug_traceBlockByHash": 0,
+}
+"""The position of the block parameter of reads at a block, which defaults to ``"latest"``."""
+
+TRANSACTION_METHODS = frozenset(
+    (
+        "eth_getTransactionByHash",
+        "eth_getTransactionReceipt",
+        "trace_transaction",
+        "trace_replayTransaction",
+        "debug_traceTransaction",
+    )
+)
+"""Reads of a transaction by hash, which never change once the transaction is mined."""
+
+CONSTANT_METHODS = frozenset(("eth_chainId", "net_version"))
+"""Methods whose responses never change for an upstream provider."""
+
+
+def get_request_key(method: str, params: Any) -> str:
+    """
+    The key of a JSON-RPC request's response in an
+    :class:`~ape_foundry.proxy.UpstreamStore`. Blocks are part of the parameters,
+    e.g. ``["0x...", "0x10"]`` for ``eth_getBalance`` at block 16.
+    """
+    request = json.dumps([method, params or []], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(request.encode("utf8")).hexdigest()
+
+
+def is_historical(method: str, params: Any) -> bool:
+    """
+    Whether the response to a request never changes, such as reads at a block
+    number or hash, or of a transaction by hash. Reads without a block, which
+    mean the ``"latest"`` block, and unknown methods are not historical.
+    """
+    params = params or []
+    if method in CONSTANT_METHODS:
+        return True
+
+    elif method in TRANSACTION_METHODS:
+        # NOTE: Responses for transactions not yet mined are not stored.
+        return bool(params)
+
+    elif method == "eth_getLogs":
+        log_filter = params[0] if params and isinstance(params[0], dict) else {}
+        if "blockHash" in log_filter:
+            return _is_fixed_block(log_filter["blockHash"])
+
+        return _is_fixed_block(log_filter.get("fromBlock")) and _is_fixed_block(
+            log_filter.get("toBlock")
+        )
+
+    elif (index := BLOCK_PARAMETER_INDEX.get(method)) is not None:
+        return index < len(params) and _is_fixed_block(params[index])
+
+    return False
+
+
+def _is_fixed_block(block_id: Any) -> bool:
+    # A block number or hash rather than a tag such as "latest", or an EIP-1898 object.
+    if isinstance(block_id, dict):
+        return _is_fixed_block(block_id.get("blockHash") or block_id.get("blockNumber"))
+
+    elif isinstance(block_id, int):
+        return not isinstance(block_id, bool)
+
+    return isinstance(block_id, str) and is_0x_prefixed(block_id) and is_hex(block_id)
+
+
+class UpstreamStore:
+    """
+    Responses from an upstream provider, stored compressed in a SQLite database
+    and keyed by request (see :func:`~ape_foundry.proxy.get_request_key`).
+
+    Args:
+        path (Path): The database file, created if missing.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, method TEXT NOT NULL, response BLOB NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, method: str, params: Any) -> Optional[dict]:
+        """
+        Get the stored response (without its ``id``) to a request, or ``None``.
+        """
+        key = get_request_key(method, params)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def set(self, method: str, params: Any, response: dict):
+        """
+        Store the response to a request, replacing any stored one.
+        """
+        key = get_request_key(method, params)
+        data = {k: v for k, v in response.items() if k not in ("id", "jsonrpc")}
+        value = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf8"))
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, method, response) VALUES (?, ?, ?)",
+                (key, method, value),
+            )
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class ProxyStats(BaseModel):
+    """
+    Counters for an :class:`~ape_foundry.proxy.UpstreamProxy`.
+    """
+
+    requests: int = 0
+    """The number of requests received."""
+
+    hits: int = 0
+    """The number of requests served from the store."""
+
+    misses: int = 0
+    """The number of requests not in the store."""
+
+    coalesced: int = 0
+    """The number of requests that waited for an identical one already in flight."""
+
+    upstream_requests: int = 0
+    """The number of requests sent to the upstream provider."""
+
+
+class RateLimiter:
+    """
+    A token bucket limiting how often something happens, shared by threads.
+
+    Args:
+        rate (float): The sustained number of acquisitions per second.
+        burst (int): The number of acquisitions allowed at once after being idle.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Wait for a token.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        # NOTE: The token is already taken, so waiting outside the lock keeps order.
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = {}
+
+
+class UpstreamProxy:
+    """
+    A local JSON-RPC proxy between forked Anvil nodes and their upstream provider.
+    In ``"record"`` mode, requests are sent upstream and the responses stored.
+    In ``"replay"`` mode, requests are served from the store with no network access,
+    and requests that were never recorded fail. In ``"cache"`` mode, historical
+    reads (see :func:`~ape_foundry.proxy.is_historical`) are served from the store
+    when there, else sent upstream and stored, and other requests are sent upstream.
+
+    Identical requests in flight at the same time are sent upstream once,
+    such as when multiple nodes fork the same block, and ``rate_limit`` caps how
+    many requests per second are sent upstream by all of them together.
+
+    Args:
+        store (:class:`~ape_foundry.proxy.UpstreamStore`): Where responses are stored.
+        upstream_uri (Optional[str]): The upstream provider's URI. Not needed to replay.
+        mode (str): ``"record"``, ``"replay"`` or ``"cache"``.
+        timeout (float): Seconds to wait for each upstream response.
+        host (str): The address to serve on.
+        port (int): The port to serve on. Defaults to a free port.
+        rate_limit (Optional[float]): The maximum upstream requests per second.
+    """
+
+    def __init__(
+        self,
+        store: UpstreamStore,
+        upstream_uri: Optional[str] = None,
+        mode: ProxyMode = "record",
+        timeout: float = 300,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        rate_limit: Optional[float] = None,
+    ):
+        if mode not in ("record", "replay", "cache"):
+            raise ValueError(f"Unsupported proxy mode '{mode}'.")
+
+        elif mode != "replay" and not upstream_uri:
+            raise FoundryProviderError(f"Upstream URI required to {mode}.")
+
+        self.store = store
+        self.upstream_uri = upstream_uri
+        self.mode = mode
+        self.timeout = timeout
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._session = create_session(pool_size=64) if upstream_uri else None
+        self._rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self._lock = threading.Lock()
+        self._stats = ProxyStats()
+        self._in_flight: dict[str, _InFlight] = {}
+
+    @property
+    def uri(self) -> str:
+        if self._server is None:
+            raise FoundryProviderError("Proxy not started.")
+
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    @property
+    def stats(self) -> ProxyStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+    def start(self) -> str:
+        """
+        Start serving in a background thread.
+
+        Returns:
+            str: The proxy's URI.
+        """
+        if self._server is None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _ProxyRequestHandler)
+            self._server.daemon_threads = True
+            setattr(self._server, "proxy", self)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        return self.uri
+
+    def stop(self):
+        if (server := self._server) is not None:
+            self._server = None
+            server.shutdown()
+            server.server_close()
+
+        if self._session is not None:
+            self._session.close()
+
+        self.store.close()
+
+    def serve(self, clients_path: Optional[Path] = None, poll_interval: float = 5):
+        """
+        Serve until stopped or, when ``clients_path`` is given, until none
+        of the processes with a file named by their PID in it are alive.
+        """
+        self.start()
+        try:
+            while self._server is not None:
+                time.sleep(poll_interval)
+                if clients_path is not None and not _get_clients(clients_path):
+                    break
+        finally:
+            self.stop()
+
+    def request(self, method: str, params: Optional[list] = None) -> Any:
+        """
+        Make a request through the proxy, e.g. for the upstream's genesis block.
+        """
+        response = self.handle({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        if "error" in response:
+            error = response["error"]
+            raise FoundryProviderError(error.get("message", f"{error}"))
+
+        return response.get("result")
+
+    def handle(self, payload: Union[dict, list]) -> Any:
+        """
+        Get the response to a JSON-RPC request or batch of requests.
+        """
+        if isinstance(payload, list):
+            return [self._handle_request(r) for r in payload]
+
+        return self._handle_request(payload)
+
+    def _handle_request(self, request: dict) -> dict:
+        method, params = request.get("method", ""), request.get("params") or []
+        with self._lock:
+            self._stats.requests += 1
+
+        if self.mode == "replay":
+            if (response := self.store.get(method, params)) is None:
+                with self._lock:
+                    self._stats.misses += 1
+
+                return _error(request, f"No recorded response for '{method}' {params}.")
+
+            with self._lock:
+                self._stats.hits += 1
+
+            return {"jsonrpc": "2.0", "id": request.get("id"), **response}
+
+        cache = self.mode == "record"
+        if self.mode == "cache" and is_historical(method, params):
+            if (response := self.store.get(method, params)) is not None:
+                with self._lock:
+                    self._stats.hits += 1
+
+                return {"jsonrpc": "2.0", "id": request.get("id"), **response}
+
+            with self._lock:
+                self._stats.misses += 1
+
+            cache = True
+
+        key = get_request_key(method, params)
+        with self._lock:
+            if (in_flight := self._in_flight.get(key)) is not None:
+                self._stats.coalesced += 1
+                leader = False
+            else:
+                in_flight = self._in_flight[key] = _InFlight()
+                leader = True
+
+        if not leader:
+            in_flight.done.wait()
+            return {**in_flight.response, "id": request.get("id")}
+
+        try:
+            response = self._forward(request)
+            # NOTE: Errors, such as rate limits, are not stored. Nor are missing
+            #   results when caching, e.g. for transactions that are not mined yet.
+            if cache and "result" in response:
+                if self.mode == "record" or response["result"] is not None:
+                    self.store.set(method, params, response)
+
+            in_flight.response = response
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+            in_flight.done.set()
+
+        return response
+
+    def _forward(self, request: dict) -> dict:
+        if self._session is None or self.upstream_uri is None:
+            return _error(request, "No upstream provider.")
+
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire()
+
+        with self._lock:
+            self._stats.upstream_requests += 1
+
+        try:
+            response = self._session.post(self.upstream_uri, json=request, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (RequestException, ValueError) as err:
+            return _error(request, f"Upstream request failed: {err}")
+
+
+class _ProxyRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            response = _error({}, "Parse error.")
+        else:
+            response = getattr(self.server, "proxy").handle(payload)
+
+        body = json.dumps(response).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # NOTE: Requests are too frequent to log.
+        pass
+
+
+def _error(request: dict, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request.get("id"),
+        "error": {"code": -32000, "message": message},
+    }
+
+
+def get_shared_proxy_uri(
+    base_path: Path,
+    upstream_uri: str,
+    store_path: Path,
+    rate_limit: Optional[float] = None,
+    timeout: float = 300,
+    start_timeout: float = 20,
+) -> str:
+    """
+    Get the URI of the host's caching proxy (see :class:`~ape_foundry.proxy.UpstreamProxy`)
+    for the given upstream and store, starting it when not running. All processes on the
+    host share the proxy, such as ``pytest-xdist`` workers forking the same network, so
+    each historical read is requested upstream once and the rate limit applies to all
+    of them together. The proxy exits once the last process using it exits.
+
+    Args:
+        base_path (Path): The directory tracking shared proxies.
+        upstream_uri (str): The upstream provider's URI.
+        store_path (Path): The store of cached responses.
+        rate_limit (Optional[float]): The maximum upstream requests per second,
+          when starting the proxy.
+        timeout (float): Seconds to wait for each upstream response.
+        start_timeout (float): Seconds to wait for a started proxy to accept connections.
+
+    Returns:
+        str
+    """
+    key = hashlib.sha256(f"{upstream_uri}\0{store_path}".encode("utf8")).hexdigest()[:16]
+    path = base_path / key
+    clients_path = path / "clients"
+    _register_client(clients_path)
+    with _locked(path / "proxy.lock"):
+        info_path = path / "proxy.json"
+        try:
+            info = json.loads(info_path.read_text())
+        except (OSError, ValueError):
+            info = None
+
+        if info and pid_is_alive(info["pid"]) and port_is_open("127.0.0.1", info["port"]):
+            return f"http://127.0.0.1:{info['port']}"
+
+        port = find_free_port()
+        cmd = [
+            sys.executable,
+            "-m",
+            "ape_foundry.proxy",
+            "--store",
+            f"{store_path}",
+            "--port",
+            f"{port}",
+            "--clients",
+            f"{clients_path}",
+            "--timeout",
+            f"{timeout}",
+        ]
+        if rate_limit:
+            cmd.extend(("--rate-limit", f"{rate_limit}"))
+
+        # NOTE: Detached so it may outlive the process that started it.
+        process = popen(
+            cmd,
+            env={**os.environ, UPSTREAM_URI_ENV: upstream_uri},
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + start_timeout
+        while not port_is_open("127.0.0.1", port):
+            if process.poll() is not None or time.monotonic() >= deadline:
+                process.kill()
+                raise FoundrySubprocessError("Failed to start upstream proxy.")
+
+            time.sleep(0.05)
+
+        info_path.write_text(json.dumps({"pid": process.pid, "port": port}))
+        return f"http://127.0.0.1:{port}"
+
+
+@contextmanager
+def _locked(lock_path: Path) -> Iterator[None]:
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_REGISTERED_CLIENTS: set[Path] = set()
+
+
+def _register_client(clients_path: Path):
+    if clients_path in _REGISTERED_CLIENTS:
+        return
+
+    clients_path.mkdir(parents=True, exist_ok=True)
+    client_file = clients_path / f"{os.getpid()}"
+    client_file.touch()
+    atexit.register(client_file.unlink, missing_ok=True)
+    _REGISTERED_CLIENTS.add(clients_path)
+
+
+def _get_clients(clients_path: Path) -> list[int]:
+    if not clients_path.is_dir():
+        return []
+
+    pids = [int(f.name) for f in clients_path.iterdir() if f.name.isnumeric()]
+    return [pid for pid in pids if pid_is_alive(pid)]
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve a shared upstream caching proxy.")
+    parser.add_argument("--store", type=Path, required=True)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--clients", type=Path)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--rate-limit", type=float)
+    args = parser.parse_args(argv)
+    proxy = UpstreamProxy(
+        UpstreamStore(args.store),
+        upstream_uri=os.environ[UPSTREAM_URI_ENV],
+        mode="cache",
+        timeout=args.timeout,
+        port=args.port,
+        rate_limit=args.rate_limit,
+    )
+    proxy.serve(clients_path=args.clients)
+
+
+if __name__ == "__main__":
+    main()
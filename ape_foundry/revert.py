@@ -0,0 +1,119 @@
+import threading
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, Optional
+
+from eth_abi import decode
+from eth_abi.exceptions import DecodingError
+from eth_pydantic_types import HexBytes
+from eth_utils import is_0x_prefixed, is_hex, keccak, to_checksum_address, to_hex
+
+if TYPE_CHECKING:
+    from ethpm_types import ContractType
+    from ethpm_types.abi import ErrorABI
+
+ERROR_STRING_SELECTOR = HexBytes("0x08c379a0")
+"""The selector of ``Error(string)``, used by ``require()`` and ``revert()`` with a reason."""
+
+PANIC_SELECTOR = HexBytes("0x4e487b71")
+"""The selector of ``Panic(uint256)``, used by Solidity for failed assertions and such."""
+
+
+def get_revert_data(exception: Exception) -> Optional[HexBytes]:
+    """
+    Get the revert data included in an RPC error, such as the ``data`` of
+    a ``web3`` ``ContractLogicError``, or ``None`` when there is none.
+    """
+    data: Any = getattr(exception, "data", None)
+    if isinstance(data, dict):
+        data = data.get("data")
+
+    if isinstance(data, str) and data.startswith("Reverted "):
+        data = data.split(" ", 1)[1]
+
+    if not isinstance(data, str) or not is_0x_prefixed(data) or not is_hex(data):
+        return None
+
+    # NOTE: Anything shorter than a selector is not an error.
+    return HexBytes(data) if len(data) >= 10 else None
+
+
+class ErrorSelectorIndex:
+    """
+    An index of custom error ABIs by selector, for decoding revert data
+    without tracing the transaction to find which contract reverted.
+
+    Args:
+        contract_types (Iterable[ContractType]): Contract types with errors to index.
+    """
+
+    def __init__(self, contract_types: Iterable["ContractType"] = ()):
+        self._errors: dict[bytes, dict[str, "ErrorABI"]] = {}
+        self._lock = threading.Lock()
+        for contract_type in contract_types:
+            self.add(contract_type)
+
+    def __len__(self) -> int:
+        return sum(len(abis) for abis in self._errors.values())
+
+    def __contains__(self, selector: bytes) -> bool:
+        return bytes(selector[:4]) in self._errors
+
+    def add(self, contract_type: "ContractType"):
+        """
+        Index the errors of a contract type.
+        """
+        with self._lock:
+            for abi in contract_type.errors:
+                selector = keccak(text=abi.selector)[:4]
+                self._errors.setdefault(selector, {})[abi.signature] = abi
+
+    def get(self, selector: bytes) -> list["ErrorABI"]:
+        """
+        Get the error ABIs with the given selector. There is usually one,
+        but unrelated errors can share a selector.
+        """
+        return list(self._errors.get(bytes(selector[:4]), {}).values())
+
+    def decode(self, data: bytes) -> Optional[str]:
+        """
+        Decode revert data to a message, such as the reason of an ``Error(string)``
+        or ``Unauthorized(addr=0x..., counter=1)`` for an indexed custom error.
+
+        Returns:
+            Optional[str]: ``None`` when the data is not an indexed error.
+        """
+        selector, arguments = bytes(data[:4]), bytes(data[4:])
+        if selector == ERROR_STRING_SELECTOR:
+            try:
+                return decode(("string",), arguments)[0]
+            except (DecodingError, UnicodeDecodeError):
+                return None
+
+        elif selector == PANIC_SELECTOR:
+            try:
+                return f"Panic({hex(decode(('uint256',), arguments)[0])})"
+            except DecodingError:
+                return None
+
+        for abi in self.get(selector):
+            try:
+                values = decode([i.canonical_type for i in abi.inputs], arguments, strict=False)
+            except DecodingError:
+                continue
+
+            inputs = ", ".join(
+                f"{i.name}={_to_python(i.canonical_type, v)}" for i, v in zip(abi.inputs, values)
+            )
+            return f"{abi.name}({inputs})"
+
+        return None
+
+
+def _to_python(abi_type: str, value: Any) -> Any:
+    if abi_type == "address":
+        return to_checksum_address(value)
+
+    elif isinstance(value, bytes):
+        return to_hex(value)
+
+    return value
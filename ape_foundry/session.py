@@ -0,0 +1,125 @@
+import threading
+
+from pydantic import BaseModel
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class SessionStats(BaseModel):
+    """
+    Connection counters for an HTTP session created by
+    :func:`~ape_foundry.session.create_session`.
+    """
+
+    requests: int = 0
+    """The number of requests sent."""
+
+    connections_opened: int = 0
+    """The number of new connections opened."""
+
+    @property
+    def connections_reused(self) -> int:
+        """The number of requests sent over an already-open connection."""
+        return max(self.requests - self.connections_opened, 0)
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+    An ``HTTPAdapter`` that counts the requests it sends and the connections it opens.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        super().__init__(*args, **kwargs)
+
+    def _count(self, requests: int = 0, connections: int = 0):
+        with self._lock:
+            self.requests += requests
+            self.connections_opened += connections
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        count = self._count
+
+        # NOTE: Count when connecting rather than when pools create connections,
+        #   as connections closed by the server are reconnected in place.
+        class _HTTPConnection(HTTPConnection):
+            def connect(self):
+                super().connect()
+                count(connections=1)
+
+        class _HTTPSConnection(HTTPSConnection):
+            def connect(self):
+                super().connect()
+                count(connections=1)
+
+        class _HTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = _HTTPConnection
+
+        class _HTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = _HTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _HTTPConnectionPool,
+            "https": _HTTPSConnectionPool,
+        }
+
+    def send(self, *args, **kwargs):
+        self._count(requests=1)
+        return super().send(*args, **kwargs)
+
+
+def create_session(
+    pool_size: int = 10,
+    keep_alive: bool = True,
+    retries: int = 0,
+    backoff_factor: float = 0.1,
+) -> Session:
+    """
+    Create an HTTP session for JSON-RPC requests.
+
+    Args:
+        pool_size (int): The maximum number of connections to keep open per host.
+        keep_alive (bool): Whether to reuse connections across requests.
+        retries (int): The number of times to retry failing to connect.
+          Requests are never retried once sent, as they may not be idempotent.
+        backoff_factor (float): Scales the delay between retries.
+
+    Returns:
+        ``requests.Session``
+    """
+    session = Session()
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=backoff_factor,
+    )
+    adapter = CountingHTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+
+    return session
+
+
+def session_stats(session: Session) -> SessionStats:
+    """
+    Get the connection counters of a session created by
+    :func:`~ape_foundry.session.create_session`.
+    """
+    stats = SessionStats()
+    adapters = {id(a): a for a in session.adapters.values() if isinstance(a, CountingHTTPAdapter)}
+    for adapter in adapters.values():
+        stats.requests += adapter.requests
+        stats.connections_opened += adapter.connections_opened
+
+    return stats
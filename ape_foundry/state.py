@@ -0,0 +1,72 @@
+import gzip
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from ethpm_types import ContractType
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class StateTemplates:
+    """
+    Compressed chain-state templates, as produced by ``anvil_dumpState``, stored on disk.
+    A template is identified by a name and a key; the key captures everything that
+    would make a stored state invalid, such as the compiled contracts and node config.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def get_path(self, name: str, key: str) -> Path:
+        return self.path / f"{name}-{key}.state.gz"
+
+    def save(self, name: str, key: str, state: bytes) -> Path:
+        """
+        Store a state, compressing it unless already compressed.
+        """
+        if not state.startswith(GZIP_MAGIC):
+            state = gzip.compress(state)
+
+        path = self.get_path(name, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write atomically, as other processes may be loading the same template.
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(state)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, name: str, key: str) -> Optional[bytes]:
+        """
+        Get a stored state (compressed), if there is one.
+        """
+        try:
+            return self.get_path(name, key).read_bytes()
+        except OSError:
+            return None
+
+
+def state_key(contract_types: Iterable["ContractType"], *parts: str) -> str:
+    """
+    Hash the bytecode of the given contract types, along with any other
+    identifying parts, into a key for a state template.
+    """
+    contracts = []
+    for contract_type in sorted(contract_types, key=lambda ct: ct.name or ""):
+        deployment, runtime = contract_type.deployment_bytecode, contract_type.runtime_bytecode
+        contracts.append(
+            [
+                contract_type.name,
+                deployment.bytecode if deployment else None,
+                runtime.bytecode if runtime else None,
+            ]
+        )
+
+    # NOTE: JSON-encoded so that different parts never hash the same, e.g. "ab", "c" and "a", "bc".
+    data = json.dumps([contracts, list(parts)], separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf8")).hexdigest()[:16]
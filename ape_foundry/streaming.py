@@ -0,0 +1,69 @@
+import json
+from collections.abc import Iterator
+from typing import IO, Any
+
+import ijson  # type: ignore
+
+from ape_foundry.exceptions import FoundryProviderError
+
+DEFAULT_BUFFER_SIZE = 2**16
+
+
+class _HeadRecorder:
+    """
+    Wraps a binary stream, keeping only the first ``limit`` bytes read, so small
+    responses (such as errors) can be inspected after being parsed incrementally.
+    """
+
+    def __init__(self, stream: IO[bytes], limit: int = DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.limit = limit
+        self.head = b""
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if len(self.head) < self.limit:
+            self.head += data[: self.limit - len(self.head)]
+
+        return data
+
+
+def iter_json_items(
+    stream: IO[bytes], prefix: str, buf_size: int = DEFAULT_BUFFER_SIZE
+) -> Iterator[Any]:
+    """
+    Incrementally parse the items at the given prefix from a JSON-RPC response stream,
+    such as ``"result.structLogs.item"`` for ``debug_traceTransaction``, yielding each
+    as soon as it is parsed. Only one item and one buffer are held at a time, so
+    memory stays bounded regardless of the size of the response.
+
+    Args:
+        stream (IO[bytes]): The raw response.
+        prefix (str): The ``ijson`` prefix of the items.
+        buf_size (int): The number of bytes to read at a time.
+
+    Raises:
+        :class:`~ape_foundry.exceptions.FoundryProviderError`: When the
+          response is a JSON-RPC error.
+
+    Returns:
+        Iterator[Any]
+    """
+    recorder = _HeadRecorder(stream, limit=buf_size)
+    found = False
+    for item in ijson.items(recorder, prefix, use_float=True, buf_size=buf_size):
+        found = True
+        yield item
+
+    if found or len(recorder.head) >= recorder.limit:
+        return
+
+    # No items; check whether the (small) response is an error.
+    try:
+        response = json.loads(recorder.head)
+    except ValueError:
+        return
+
+    if isinstance(response, dict) and (error := response.get("error")):
+        message = error.get("message", error) if isinstance(error, dict) else error
+        raise FoundryProviderError(f"{message}")
@@ -1,17 +1,248 @@
+from collections.abc import Iterator
+from enum import IntEnum
 from functools import cached_property
-from typing import Any
+from typing import TYPE_CHECKING, Any, ClassVar, Optional
 
-from ape.exceptions import ContractNotFoundError
+from ape.exceptions import ContractNotFoundError, ProviderError, TransactionNotFoundError
+from ape.logging import logger
 from ape_ethereum.trace import TraceApproach, TransactionTrace
+from evm_trace import (
+    CallTreeNode,
+    ParityTraceList,
+    create_trace_frames,
+    get_calltree_from_geth_call_trace,
+    get_calltree_from_parity_trace,
+)
 from hexbytes import HexBytes
 
+from ape_foundry.trace_cache import get_trace_cache_key
 
-class AnvilTransactionTrace(TransactionTrace):
-    call_trace_approach: TraceApproach = TraceApproach.PARITY
-    debug_trace_transaction_parameters: dict = {
+if TYPE_CHECKING:
+    from ethpm_types.abi import MethodABI
+
+
+class TraceDetail(IntEnum):
+    """
+    How much of each struct log ``debug_traceTransaction`` captures. Each tier
+    includes everything in the tiers before it, so frames fetched at one tier
+    serve any request for a lower one.
+    """
+
+    OPCODES = 0
+    """
+    Only the opcode, program counter, gas and depth of each step, e.g. for
+    counting opcodes. Without the stack, it is not enough to build call trees.
+    """
+
+    STORAGE = 1
+    """Adds the storage touched by each step."""
+
+    STRUCT_LOGS = 2
+    """Adds the stack, e.g. for call addresses, source tracebacks and coverage."""
+
+    FULL = 3
+    """Adds memory, e.g. for the calldata and return data of sub-calls."""
+
+
+TRACE_DETAIL_PARAMETERS: dict[TraceDetail, dict] = {
+    TraceDetail.OPCODES: {
+        "stepsTracing": True,
+        "disableStack": True,
+        "disableStorage": True,
+        "enableMemory": False,
+    },
+    TraceDetail.STORAGE: {
+        "stepsTracing": True,
+        "disableStack": True,
+        "disableStorage": False,
+        "enableMemory": False,
+    },
+    TraceDetail.STRUCT_LOGS: {
+        "stepsTracing": True,
+        "disableStack": False,
+        "disableStorage": False,
+        "enableMemory": False,
+    },
+    TraceDetail.FULL: {
         "stepsTracing": True,
         "enableMemory": True,
-    }
+    },
+}
+
+
+class AnvilTransactionTrace(TransactionTrace):
+    call_trace_approach: TraceApproach = TraceApproach.PARITY
+    debug_trace_transaction_parameters: dict = TRACE_DETAIL_PARAMETERS[TraceDetail.FULL]
+
+    trace_detail: TraceDetail = TraceDetail.FULL
+    """
+    The detail of :attr:`~ape_foundry.trace.AnvilTransactionTrace.raw_trace_frames`.
+    Ape's own features request the cheapest tier they need via
+    :meth:`~ape_foundry.trace.AnvilTransactionTrace.get_struct_logs`.
+    """
+
+    source_trace_detail: TraceDetail = TraceDetail.STRUCT_LOGS
+    """
+    The detail of :meth:`~ape_foundry.trace.AnvilTransactionTrace.get_raw_frames`,
+    which compiler plugins read for source tracebacks and coverage. Use ``FULL`` for
+    plugins reading the calldata of sub-calls from memory.
+    """
+
+    max_cached_frames: ClassVar[int] = 10_000
+    """
+    Struct logs are streamed; only traces with at most this many frames are kept
+    in memory for re-use. Larger ones are streamed again each time they are read.
+    """
+
+    _trace_data: Optional[list[dict]] = None
+    """``trace_transaction`` data fetched ahead of time, e.g. asynchronously."""
+
+    _frames_detail: Optional[TraceDetail] = None
+    """The detail of the cached frames, once all have been read."""
+
+    @property
+    def raw_trace_frames(self) -> Iterator[dict]:
+        yield from self.get_struct_logs()
+
+    def get_raw_frames(self) -> Iterator[dict]:
+        # NOTE: Source tracebacks and coverage follow the program counter through
+        #   jumps and calls, which needs the stack but not memory.
+        yield from self.get_struct_logs(self.source_trace_detail)
+
+    def get_addresses_used(self, reverse: bool = False):
+        frames = create_trace_frames(self.get_struct_logs(TraceDetail.STRUCT_LOGS))
+        for frame in list(frames)[::-1] if reverse else frames:
+            if addr := frame.address:
+                yield self._ecosystem.decode_address(addr)
+
+    def get_struct_logs(self, detail: Optional[TraceDetail] = None) -> Iterator[dict]:
+        """
+        Get the ``debug_traceTransaction`` struct logs with at least the given
+        detail. Frames already fetched at the same or a higher tier are re-used;
+        otherwise, they are fetched again at the requested tier.
+
+        Args:
+            detail (Optional[:class:`~ape_foundry.trace.TraceDetail`]): Defaults
+              to :attr:`~ape_foundry.trace.AnvilTransactionTrace.trace_detail`.
+
+        Returns:
+            Iterator[dict]
+        """
+        detail = self.trace_detail if detail is None else detail
+        if self._frames_detail is not None and self._frames_detail >= detail:
+            yield from self._frames
+            return
+
+        # NOTE: Only keep frames once they have all been read, bounding memory use.
+        frames: Optional[list[dict]] = []
+        for frame in self._stream_struct_logs(detail):
+            if frames is not None:
+                if len(frames) < self.max_cached_frames:
+                    frames.append(frame)
+                else:
+                    # perf: Too large to keep around.
+                    frames = None
+
+            yield frame
+
+        if frames is not None:
+            self._frames = frames
+            self._frames_detail = detail
+
+    def _stream_struct_logs(self, detail: Optional[TraceDetail] = None) -> Iterator[dict]:
+        detail = self.trace_detail if detail is None else detail
+        parameters = (
+            self.debug_trace_transaction_parameters
+            if detail is TraceDetail.FULL
+            else TRACE_DETAIL_PARAMETERS[detail]
+        )
+        yield from self.provider.stream_request(
+            "debug_traceTransaction",
+            [self.transaction_hash, parameters],
+            iter_path="result.structLogs.item",
+        )
+
+    @cached_property
+    def _last_frame(self) -> Optional[dict]:
+        last = None
+        for frame in self.get_struct_logs(TraceDetail.STRUCT_LOGS):
+            last = frame
+
+        return last
+
+    @cached_property
+    def _revert_str_from_trace_frames(self) -> Optional[HexBytes]:
+        # perf: Read from the top-level call rather than from the memory of the
+        #   last struct log, which needs the memory of every step.
+        if (call := self._get_top_call()) and call.get("error"):
+            return HexBytes(output) if (output := call.get("output")) else None
+
+        return None
+
+    @cached_property
+    def _return_data_from_trace_frames(self) -> Optional[HexBytes]:
+        if (call := self._get_top_call()) and not call.get("error"):
+            return HexBytes(output) if (output := call.get("output")) else None
+
+        return None
+
+    def _get_top_call(self) -> Optional[dict]:
+        try:
+            return self._debug_trace_top_call()
+        except ProviderError as err:
+            logger.debug(f"Unable to trace the top-level call: {err}")
+            return None
+
+    @cached_property
+    def state_diff(self) -> dict:
+        """
+        The accounts changed by the transaction, computed node-side by the native
+        ``prestateTracer``, as ``{"pre": {...}, "post": {...}}`` mappings of addresses
+        to their changed balance, nonce, code and storage.
+        """
+        return self.get_prestate(diff_mode=True)
+
+    def get_prestate(self, diff_mode: bool = False) -> dict:
+        """
+        Get the state of the accounts the transaction touches, from before it ran,
+        using the native ``prestateTracer``.
+
+        Args:
+            diff_mode (bool): Set to ``True`` to only get what changed,
+              before and after the transaction.
+
+        Returns:
+            dict
+        """
+        parameters = {"tracer": "prestateTracer", "tracerConfig": {"diffMode": diff_mode}}
+        return self._make_cached_request(
+            f"prestateTracer:{diff_mode}",
+            "debug_traceTransaction",
+            [self.transaction_hash, parameters],
+        )
+
+    def _debug_trace_transaction_call_tracer(self) -> CallTreeNode:
+        # NOTE: Overridden to not request struct-log options, such as memory,
+        #   which the native tracer ignores.
+        data = self._make_cached_request(
+            "callTracer",
+            "debug_traceTransaction",
+            [self.transaction_hash, {"tracer": "callTracer"}],
+        )
+        return get_calltree_from_geth_call_trace(data)
+
+    def _trace_transaction(self) -> CallTreeNode:
+        if self._trace_data is None:
+            try:
+                self._trace_data = self._get_trace_transaction_data()
+            except ProviderError as err:
+                if "transaction not found" in str(err).lower():
+                    raise TransactionNotFoundError(transaction_hash=self.transaction_hash) from err
+
+                raise  # The ProviderError as-is
+
+        parity_objects = ParityTraceList.model_validate(self._trace_data)
+        return get_calltree_from_parity_trace(parity_objects)
 
     @cached_property
     def return_value(self) -> Any:
@@ -23,19 +254,137 @@ class AnvilTransactionTrace(TransactionTrace):
 
         # perf: Avoid any model serializing/deserializing that happens at
         #   Ape's abstract layer at this point.
-        trace_tx_iter = self.provider.stream_request("trace_transaction", [self.transaction_hash])
-        if not (top_level_call := next(trace_tx_iter, None)):
+        if not (top_level_call := self._get_top_level_call()):
             return (None,)
 
+        address, calldata, output = top_level_call
+        if not output:
+            return (None,)
+
+        abi = self._get_method_abi(address, calldata) if address and calldata else None
+        if abi := abi or self.root_method_abi:
+            return self._ecosystem.decode_returndata(abi, HexBytes(output))
+
+        return (None,)
+
+    def _get_top_level_call(self) -> Optional[tuple[Optional[str], Optional[str], Optional[str]]]:
+        # Returns the top-level call's receiver, calldata and output.
+        if self._trace_data is None:
+            self._trace_data = self._get_cached_data("trace_transaction")
+
+        if self._trace_data is not None:
+            if not (call := next(iter(self._trace_data), None)):
+                return None
+
+            action = call.get("action") or {}
+            return action.get("to"), action.get("input"), (call.get("result") or {}).get("output")
+
+        try:
+            call = self._debug_trace_top_call()
+        except ProviderError:
+            # Not supported by this node; stream the trace instead.
+            call = next(
+                self.provider.stream_request("trace_transaction", [self.transaction_hash]), None
+            )
+            if not call:
+                return None
+
+            action = call.get("action") or {}
+            return action.get("to"), action.get("input"), (call.get("result") or {}).get("output")
+
+        if not call:
+            return None
+
+        # NOTE: The output of a failed call is its revert data, not a return value.
+        output = None if call.get("error") else call.get("output")
+        return call.get("to"), call.get("input"), output
+
+    def get_revert_data(self) -> Optional[HexBytes]:
+        """
+        Get the data the transaction reverted with, such as an encoded custom error,
+        using only its top-level call rather than the trace of the whole transaction.
+        Reverts usually bubble up, so this is the error of the call that failed.
+
+        Returns:
+            Optional[HexBytes]: ``None`` when the transaction did not revert with data
+            or the node does not support ``callTracer``.
+        """
+        try:
+            call = self._debug_trace_top_call()
+        except ProviderError:
+            return None
+
+        if not call or not call.get("error") or not (output := call.get("output")):
+            return None
+
+        return HexBytes(output) if output != "0x" else None
+
+    def _debug_trace_top_call(self) -> Optional[dict]:
+        # perf: Only ask for the top-level call, rather than having the node
+        #   build the trace of the whole transaction.
+        parameters = {"tracer": "callTracer", "tracerConfig": {"onlyTopCall": True}}
+        return self._make_cached_request(
+            "callTracer:onlyTopCall",
+            "debug_traceTransaction",
+            [self.transaction_hash, parameters],
+        )
+
+    def _get_method_abi(self, address: str, calldata: str) -> Optional["MethodABI"]:
+        # NOTE: Resolving the contract type is slow, so the resolved ABIs
+        #   are cached by the provider per address and selector. Misses are not
+        #   cached, as the contract type may be cached or deployed later.
+        abis = getattr(self.provider, "_method_abis", None)
+        key = (address.lower(), calldata[:10])
+        if abis is not None and (abi := abis.get(key)) is not None:
+            return abi
+
         try:
-            address = top_level_call["action"]["to"]
-            calldata = top_level_call["action"]["input"]
             contract_type = self.chain_manager.contracts[address]
             abi = contract_type.methods[calldata[:10]]
         except (KeyError, ContractNotFoundError):
-            abi = self.root_method_abi
+            return None
 
-        if output := top_level_call.get("result", {}).get("output"):
-            return self._ecosystem.decode_returndata(abi, HexBytes(output))
+        if abis is not None:
+            abis[key] = abi
 
-        return (None,)
+        return abi
+
+    def _get_cache_key(self, kind: str) -> str:
+        identity = getattr(self.provider, "trace_cache_identity", "")
+        return get_trace_cache_key(identity, kind, self.transaction_hash)
+
+    def _get_cached_data(self, kind: str) -> Optional[Any]:
+        if (cache := getattr(self.provider, "trace_cache", None)) is None:
+            return None
+
+        return cache.get(self._get_cache_key(kind))
+
+    def _set_cached_data(self, kind: str, data: Any):
+        if (cache := getattr(self.provider, "trace_cache", None)) is not None:
+            cache.set(self._get_cache_key(kind), data)
+
+    def _make_cached_request(self, kind: str, rpc: str, parameters: list) -> Any:
+        # NOTE: Traces of the same transaction are often created more than once,
+        #   e.g. for an error, then for showing it, so their data is cached.
+        if (data := self._get_cached_data(kind)) is not None:
+            return data
+
+        data = self.provider.make_request(rpc, parameters)
+        self._set_cached_data(kind, data)
+        return data
+
+    def _get_trace_transaction_data(self) -> list[dict]:
+        if (data := self._get_cached_data("trace_transaction")) is not None:
+            return data
+
+        # perf: Traces of the following blocks are often read next, such as when
+        #   reporting gas for a test's transactions, so the provider may fetch
+        #   them all at once.
+        if (prefetch := getattr(self.provider, "_prefetch_block_traces", None)) is not None and (
+            data := prefetch(self.transaction_hash)
+        ) is not None:
+            return data
+
+        data = self.provider.make_request("trace_transaction", [self.transaction_hash])
+        self._set_cached_data("trace_transaction", data)
+        return data
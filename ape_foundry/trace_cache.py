@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import json
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+DEFAULT_TRACE_CACHE_SIZE = 64 * 2**20
+
+
+def get_trace_cache_key(identity: str, kind: str, transaction_hash: str) -> str:
+    """
+    The key of a transaction's trace data of the given kind, e.g. ``"trace_transaction"``,
+    on the chain with the given identity.
+    """
+    return f"{identity}:{kind}:{transaction_hash.lower()}"
+
+
+class TraceCacheStats(BaseModel):
+    """
+    Counters for a :class:`~ape_foundry.trace_cache.TraceCache`.
+    """
+
+    hits: int = 0
+    """The number of lookups served from memory or disk."""
+
+    disk_hits: int = 0
+    """The number of hits served from spilled entries on disk."""
+
+    misses: int = 0
+    """The number of lookups not in the cache."""
+
+    evictions: int = 0
+    """The number of entries evicted from memory."""
+
+    entries: int = 0
+    """The number of entries in memory."""
+
+    size: int = 0
+    """The size of the entries in memory, in bytes of JSON."""
+
+    @property
+    def hit_rate(self) -> float:
+        """The ratio of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class TraceCache:
+    """
+    A cache of trace data, such as ``trace_transaction`` results, in an in-memory LRU
+    bounded by the size of the data. Keys should identify the transaction, the kind of
+    data and the chain (or fork) it is from. When ``path`` is set, entries evicted from
+    memory are spilled to compressed files in it rather than dropped.
+
+    Args:
+        max_bytes (int): The maximum size of the entries in memory, in bytes of JSON.
+        path (Optional[Path]): A directory for spilled entries, removed when cleared.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_TRACE_CACHE_SIZE, path: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = TraceCacheStats()
+
+    @property
+    def stats(self) -> TraceCacheStats:
+        with self._lock:
+            return self._stats.model_copy(
+                update={"entries": len(self._entries), "size": self._size}
+            )
+
+    @property
+    def _size(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get cached data, or ``None`` when not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return self._entries[key][0]
+
+            if (data := self._read_spilled(key)) is not None:
+                self._stats.hits += 1
+                self._stats.disk_hits += 1
+                return data
+
+            self._stats.misses += 1
+            return None
+
+    def set(self, key: str, data: Any):
+        """
+        Cache data, evicting the least-recently used entries as needed.
+        """
+        if data is None:
+            return
+
+        encoded = json.dumps(data).encode("utf8")
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(encoded) > self.max_bytes:
+                # Too large to keep in memory at all.
+                self._spill(key, encoded)
+                return
+
+            self._entries[key] = (data, len(encoded))
+            size = self._size
+            while size > self.max_bytes:
+                evicted_key, (evicted, evicted_size) = self._entries.popitem(last=False)
+                self._stats.evictions += 1
+                size -= evicted_size
+                self._spill(evicted_key, json.dumps(evicted).encode("utf8"))
+
+    def clear(self):
+        """
+        Drop all entries, including spilled ones, such as when the chain changes.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self.path is not None:
+                shutil.rmtree(self.path, ignore_errors=True)
+
+    def _get_spill_path(self, key: str) -> Optional[Path]:
+        if self.path is None:
+            return None
+
+        return self.path / f"{hashlib.sha256(key.encode('utf8')).hexdigest()}.json.gz"
+
+    def _spill(self, key: str, encoded: bytes):
+        if (path := self._get_spill_path(key)) is None:
+            return
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(gzip.compress(encoded, compresslevel=1))
+        except OSError:
+            # Spilling is best-effort; the data can always be fetched again.
+            pass
+
+    def _read_spilled(self, key: str) -> Optional[Any]:
+        if (path := self._get_spill_path(key)) is None:
+            return None
+
+        try:
+            return json.loads(gzip.decompress(path.read_bytes()))
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,34 @@
+from typing import TYPE_CHECKING
+
+from eth_pydantic_types import HexBytes, HexBytes32
+from eth_typing import HexStr
+from eth_utils import add_0x_prefix, is_0x_prefixed, is_hex, to_hex
+
+if TYPE_CHECKING:
+    from ape.types import AddressType, ContractCode
+
+
+def to_quantity(value: int) -> str:
+    # NOTE: Requests fail when given numbers with any left padded 0s.
+    return f"0x{HexBytes(value).hex().replace('0x', '').lstrip('0')}"
+
+
+def convert_code(code: "ContractCode") -> str:
+    if isinstance(code, bytes):
+        code = to_hex(code)
+
+    elif isinstance(code, str) and not is_0x_prefixed(code):
+        code = add_0x_prefix(HexStr(code))
+
+    elif not is_hex(code):
+        raise ValueError(f"Value {code} is not convertible to hex")
+
+    return code
+
+
+def get_storage_params(address: "AddressType", slot: int, value: HexBytes) -> list:
+    return [
+        address,
+        to_hex(HexBytes32.__eth_pydantic_validate__(slot)),
+        to_hex(HexBytes32.__eth_pydantic_validate__(value)),
+    ]
@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import json
+from contextlib import suppress
+from typing import Any, Optional
+
+import websockets
+from web3.providers.async_base import AsyncBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from ape_foundry.exceptions import FoundryProviderError
+
+_CLOSED = object()
+_UNSUBSCRIBED = object()
+
+
+class AnvilWebSocketProvider(AsyncBaseProvider):
+    """
+    An async web3 provider keeping one WebSocket connection to an Anvil node.
+    Requests are pipelined: each is sent as soon as it is made and responses are
+    matched to requests by ID as they arrive, so any number can be in flight at once.
+    The same connection carries ``eth_subscribe`` notifications
+    (see :meth:`~ape_foundry.ws.AnvilWebSocketProvider.subscribe`).
+
+    Args:
+        endpoint_uri (str): The ``ws://`` URI of the node.
+        request_timeout (float): Seconds to wait for each response.
+    """
+
+    def __init__(self, endpoint_uri: str, request_timeout: float = 30):
+        super().__init__()
+        self.endpoint_uri = endpoint_uri
+        self.request_timeout = request_timeout
+        self._socket: Optional[Any] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._subscription_requests: dict[int, asyncio.Queue] = {}
+        self._subscriptions: dict[str, asyncio.Queue] = {}
+
+    async def connect(self):
+        if self._connect_lock is None:
+            # NOTE: Created lazily so it belongs to the running event loop.
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self._socket is not None:
+                return
+
+            try:
+                self._socket = await websockets.connect(self.endpoint_uri, max_size=None)
+            except (OSError, websockets.InvalidHandshake) as err:
+                raise FoundryProviderError(
+                    f"Failed to connect to WebSocket at '{self.endpoint_uri}'."
+                ) from err
+
+            self._reader_task = asyncio.create_task(self._read(self._socket))
+
+    async def disconnect(self):
+        ws, reader = self._socket, self._reader_task
+        self._socket = self._reader_task = None
+        if ws is not None:
+            await ws.close()
+
+        if reader is not None:
+            with suppress(asyncio.CancelledError):
+                await reader
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = await self.make_request(RPCEndpoint("web3_clientVersion"), [])
+        except FoundryProviderError:
+            if show_traceback:
+                raise
+
+            return False
+
+        return "result" in response
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_id = next(self._ids)
+        futures = await self._send([(request_id, method, params)])
+        return await self._wait(futures[0], method, request_id)
+
+    async def make_batch_request(self, requests: list[tuple[RPCEndpoint, Any]]) -> list:
+        batch: list[tuple[int, str, Any]] = [(next(self._ids), m, p) for m, p in requests]
+        futures = await self._send(batch)
+        try:
+            return [await self._wait(f, m, i) for f, (i, m, _) in zip(futures, batch)]
+        finally:
+            # NOTE: Drop the rest of the batch when a request times out.
+            for request_id, _, _ in batch:
+                self._pending.pop(request_id, None)
+
+    async def subscribe(self, subscription_type: str, *params: Any) -> "Subscription":
+        """
+        Subscribe via ``eth_subscribe``. Notifications are queued from when this returns,
+        so none are missed before iterating over the subscription.
+
+        Args:
+            subscription_type (str): E.g. ``"newHeads"`` or ``"logs"``.
+            *params: Additional parameters, such as a logs filter.
+
+        Returns:
+            :class:`~ape_foundry.ws.Subscription`
+        """
+        request_id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscription_requests[request_id] = queue
+        try:
+            futures = await self._send(
+                [(request_id, RPCEndpoint("eth_subscribe"), [subscription_type, *params])]
+            )
+            response = await self._wait(futures[0], "eth_subscribe", request_id)
+        finally:
+            self._subscription_requests.pop(request_id, None)
+
+        if "error" in response:
+            raise FoundryProviderError(f"Failed to subscribe: {response['error']}")
+
+        return Subscription(self, response["result"], queue)
+
+    async def unsubscribe(self, subscription_id: str):
+        if (queue := self._subscriptions.pop(subscription_id, None)) is not None:
+            queue.put_nowait(_UNSUBSCRIBED)
+
+        if self._socket is not None:
+            await self.make_request(RPCEndpoint("eth_unsubscribe"), [subscription_id])
+
+    async def _send(self, requests: list[tuple[int, str, Any]]) -> list[asyncio.Future]:
+        if self._socket is None:
+            await self.connect()
+
+        if (ws := self._socket) is None:
+            raise FoundryProviderError("WebSocket connection closed.")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        payload = []
+        for request_id, method, params in requests:
+            self._pending[request_id] = future = loop.create_future()
+            futures.append(future)
+            payload.append({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+        try:
+            await ws.send(json.dumps(payload if len(payload) > 1 else payload[0]))
+        except websockets.ConnectionClosed as err:
+            for request_id, _, _ in requests:
+                self._pending.pop(request_id, None)
+
+            raise FoundryProviderError("WebSocket connection closed.") from err
+
+        return futures
+
+    async def _wait(self, future: asyncio.Future, method: str, request_id: int) -> Any:
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError as err:
+            # NOTE: Responses arriving late are ignored.
+            self._pending.pop(request_id, None)
+            raise FoundryProviderError(
+                f"Request '{method}' timed out after {self.request_timeout} seconds."
+            ) from err
+
+    async def _read(self, ws):
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                for response in data if isinstance(data, list) else [data]:
+                    self._dispatch(response)
+
+        except websockets.ConnectionClosed:
+            pass
+
+        finally:
+            if self._socket is ws:
+                self._socket = None
+
+            error = FoundryProviderError("WebSocket connection closed.")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+            self._pending.clear()
+            for queue in self._subscriptions.values():
+                queue.put_nowait(_CLOSED)
+
+    def _dispatch(self, response: dict):
+        if response.get("method") == "eth_subscription":
+            params = response.get("params") or {}
+            if (queue := self._subscriptions.get(params.get("subscription", ""))) is not None:
+                queue.put_nowait(params.get("result"))
+
+            return
+
+        request_id = response.get("id", -1)
+        if (queue := self._subscription_requests.get(request_id)) is not None and (
+            "result" in response
+        ):
+            # NOTE: Register before any notifications, which may directly follow.
+            self._subscriptions[response["result"]] = queue
+
+        if (future := self._pending.pop(request_id, None)) is not None and not future.done():
+            future.set_result(response)
+
+
+class Subscription:
+    """
+    An ``eth_subscribe`` subscription, iterating over the results of its notifications.
+    Unsubscribe when done, e.g. by using it as an async context manager.
+    """
+
+    def __init__(
+        self, provider: AnvilWebSocketProvider, subscription_id: str, queue: asyncio.Queue
+    ):
+        self.provider = provider
+        self.id = subscription_id
+        self._queue = queue
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Any:
+        result = await self._queue.get()
+        if result is _UNSUBSCRIBED:
+            raise StopAsyncIteration
+
+        elif result is _CLOSED:
+            raise FoundryProviderError("WebSocket connection closed.")
+
+        return result
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.unsubscribe()
+
+    async def unsubscribe(self):
+        await self.provider.unsubscribe(self.id)
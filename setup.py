@@ -74,17 +74,26 @@ setup(
     url="https://github.com/ApeWorX/ape-foundry",
     include_package_data=True,
     install_requires=[
+        "aiohttp>=3.7.4,<4",
         "eth-ape>=0.8.34,<0.9",
         "eth_pydantic_types>=0.2.0,<0.3",
         "evm-trace>=0.2.3,<0.3",
         "ethpm-types>=0.6.19,<0.7",
         "hexbytes>=0.3.1,<2",
+        "ijson>=3.2,<4",
+        "requests>=2.28.1,<3",
         "web3>=6.20.1,<8",
+        "websockets>=10.1,<16",
         "yarl>=1.9.2,<2",
     ],
     python_requires=">=3.9,<4",
     extras_require=extras_require,
     py_modules=["ape_foundry"],
+    entry_points={
+        "ape_cli_subcommands": [
+            "ape_foundry=ape_foundry._cli:cli",
+        ],
+    },
     license="Apache-2.0",
     zip_safe=False,
     keywords="ethereum",
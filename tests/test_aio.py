@@ -0,0 +1,102 @@
+import asyncio
+
+from web3 import HTTPProvider
+
+from ape_foundry.trace import AnvilTransactionTrace
+
+
+def test_get_balances(connected_provider, accounts):
+    async def get_balances():
+        async with connected_provider.async_client as client:
+            return await asyncio.gather(*(client.get_balance(a.address) for a in accounts))
+
+    balances = asyncio.run(get_balances())
+    assert balances == [connected_provider.get_balance(a.address) for a in accounts]
+
+
+def test_snapshot_restore_and_mine(connected_provider):
+    start = connected_provider.get_block("latest").number
+
+    async def run():
+        async with connected_provider.async_client as client:
+            snapshot = await client.snapshot()
+            await client.mine(5)
+            mined = connected_provider.get_block("latest").number
+            assert await client.restore(snapshot)
+            return mined
+
+    assert asyncio.run(run()) == start + 5
+    assert connected_provider.get_block("latest").number == start
+
+
+def test_set_state(connected_provider, owner):
+    address = "0x0000000000000000000000000000000000000123"
+
+    async def run():
+        async with connected_provider.async_client as client:
+            await asyncio.gather(
+                client.set_balance(address, "1 ETH"),
+                client.set_code(address, "0x6001"),
+                client.set_storage(address, 1, b"\x02"),
+            )
+            return await client.get_code(address)
+
+    assert asyncio.run(run()) == b"\x60\x01"
+    assert connected_provider.get_balance(address) == 10**18
+    storage = connected_provider.get_storage(address, 1)
+    assert int.from_bytes(storage, "big") == 2
+
+
+def test_get_transaction_trace(connected_provider, contract_instance, owner, mocker):
+    tx = contract_instance.setNumber(10, sender=owner)
+
+    async def run():
+        async with connected_provider.async_client as client:
+            return await client.get_transaction_trace(tx.txn_hash)
+
+    trace = asyncio.run(run())
+    assert isinstance(trace, AnvilTransactionTrace)
+
+    # Already fetched.
+    request_spy = mocker.spy(HTTPProvider, "make_request")
+    assert trace.get_calltree().address == contract_instance.address
+    assert request_spy.call_count == 0
+
+
+def test_subscribe_blocks(connected_provider):
+    start = connected_provider.get_block("latest").number
+
+    async def run():
+        async with connected_provider.get_async_client(transport="ws") as client:
+            async with await client.subscribe_blocks() as blocks:
+                await client.mine(3)
+                numbers = []
+                async for header in blocks:
+                    numbers.append(int(header["number"], 16))
+                    if len(numbers) == 3:
+                        break
+
+                return numbers
+
+    assert asyncio.run(run()) == [start + 1, start + 2, start + 3]
+
+
+def test_subscribe_logs(connected_provider, contract_instance, owner):
+    async def run():
+        async with connected_provider.get_async_client(transport="ws") as client:
+            async with await client.subscribe_logs(address=contract_instance.address) as logs:
+                # NOTE: Sent from a thread, as the sync provider blocks the loop.
+                await asyncio.to_thread(contract_instance.setNumber, 7, sender=owner)
+                async for log in logs:
+                    return log
+
+    log = asyncio.run(run())
+    assert log["address"].lower() == contract_instance.address.lower()
+
+
+def test_pipelined_requests(connected_provider, accounts):
+    async def run():
+        async with connected_provider.get_async_client(transport="ws") as client:
+            return await asyncio.gather(*(client.get_balance(a.address) for a in accounts))
+
+    assert asyncio.run(run()) == [connected_provider.get_balance(a.address) for a in accounts]
@@ -0,0 +1,61 @@
+import pytest
+
+from ape_foundry.batch import RequestBatch
+from ape_foundry.exceptions import FoundryBatchError
+
+
+class FakeNode:
+    def __init__(self):
+        self.batches = []
+
+    def send(self, requests):
+        self.batches.append(requests)
+        return [
+            (
+                {"error": {"code": -32602, "message": "invalid address"}}
+                if params[0] == "bad"
+                else {"result": method}
+            )
+            for method, params in requests
+        ]
+
+
+def test_flush_in_chunks():
+    node = FakeNode()
+    batch = RequestBatch(node.send, size=2)
+    requests = [batch.add("anvil_setBalance", [f"{i}", "0x1"]) for i in range(5)]
+    assert not node.batches
+
+    batch.flush()
+    assert [len(b) for b in node.batches] == [2, 2, 1]
+    assert all(r.result == "anvil_setBalance" for r in requests)
+    assert not batch.pending
+
+    # Nothing left to send.
+    batch.flush()
+    assert len(node.batches) == 3
+
+
+def test_flush_maps_errors():
+    node = FakeNode()
+    batch = RequestBatch(node.send, size=2)
+    batch.add("anvil_setBalance", ["good", "0x1"])
+    batch.add("anvil_setCode", ["good", "0x"])
+    bad = batch.add("anvil_setBalance", ["bad", "0x1"])
+
+    with pytest.raises(FoundryBatchError, match=r"\[2\] anvil_setBalance\(bad, 0x1\)") as err:
+        batch.flush()
+
+    assert err.value.failed == [bad]
+    assert bad.error_message == "invalid address"
+    assert batch.requests[1].result == "anvil_setCode"
+
+
+def test_flush_missing_responses():
+    batch = RequestBatch(lambda requests: [{"result": None}])
+    batch.add("evm_setNextBlockTimestamp", [1])
+    missing = batch.add("anvil_impersonateAccount", ["0x0"])
+    with pytest.raises(FoundryBatchError) as err:
+        batch.flush()
+
+    assert err.value.failed == [missing]
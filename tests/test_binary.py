@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from ape_foundry.binary import AnvilBinary
+from ape_foundry.exceptions import FoundryNotInstalledError, FoundrySubprocessError
+
+FAKE_ANVIL = """#!/bin/sh
+echo "$1" >> "{log}"
+if [ "$1" = "--version" ]; then echo "anvil 1.0.0"; exit {code}; fi
+echo "  -p, --port <NUM>"
+echo "      --optimism  Run an Optimism chain"
+"""
+
+
+@pytest.fixture
+def fake_anvil(tmp_path, monkeypatch):
+    bin_path = tmp_path / "bin"
+    bin_path.mkdir()
+    log_path = tmp_path / "calls.log"
+
+    def make(code: int = 0):
+        anvil = bin_path / "anvil"
+        anvil.write_text(FAKE_ANVIL.format(log=log_path, code=code))
+        anvil.chmod(0o755)
+        return anvil
+
+    monkeypatch.setenv("PATH", f"{bin_path}{os.pathsep}{os.environ.get('PATH', '')}")
+    make.log_path = log_path  # type: ignore[attr-defined]
+    return make
+
+
+def test_resolve(fake_anvil, tmp_path):
+    anvil = fake_anvil()
+    cache_path = tmp_path / "anvil_bin.json"
+    binary = AnvilBinary.resolve(cache_path)
+    assert binary.path == str(anvil)
+    assert binary.version == "anvil 1.0.0"
+    assert binary.supports("--optimism")
+    assert not binary.supports("--disable-block-gas-limit")
+    assert cache_path.is_file()
+
+
+def test_resolve_uses_cache(fake_anvil, tmp_path):
+    fake_anvil()
+    cache_path = tmp_path / "anvil_bin.json"
+    AnvilBinary.resolve(cache_path)
+    calls = fake_anvil.log_path.read_text()
+    assert AnvilBinary.resolve(cache_path).version == "anvil 1.0.0"
+
+    # The executable was not run again.
+    assert fake_anvil.log_path.read_text() == calls
+
+
+def test_resolve_binary_changed(fake_anvil, tmp_path):
+    anvil = fake_anvil()
+    cache_path = tmp_path / "anvil_bin.json"
+    AnvilBinary.resolve(cache_path)
+    anvil.write_text(anvil.read_text().replace("1.0.0", "1.1.0"))
+    assert AnvilBinary.resolve(cache_path).version == "anvil 1.1.0"
+
+
+def test_resolve_error_code(fake_anvil, tmp_path):
+    fake_anvil(code=1)
+    with pytest.raises(FoundrySubprocessError, match="returned error code"):
+        AnvilBinary.resolve(tmp_path / "anvil_bin.json")
+
+
+def test_resolve_not_installed(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    with pytest.raises(FoundryNotInstalledError):
+        AnvilBinary.resolve(tmp_path / "anvil_bin.json")
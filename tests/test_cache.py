@@ -0,0 +1,24 @@
+from ape_foundry.cache import JSONCache
+
+
+def test_get_and_set(tmp_path):
+    cache = JSONCache(tmp_path / "cache.json")
+    assert cache.get("foo") is None
+    assert cache.get("foo", 1) == 1
+
+    cache.set("foo", False)
+    assert cache.get("foo") is False
+
+    # Shared across instances.
+    assert JSONCache(cache.path).get("foo") is False
+
+
+def test_max_entries(tmp_path):
+    cache = JSONCache(tmp_path / "cache.json", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)  # Now the most recent.
+    cache.set("c", 4)
+    assert cache.get("b") is None
+    assert cache.get("a") == 3
+    assert cache.get("c") == 4
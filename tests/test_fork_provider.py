@@ -4,10 +4,15 @@ import pytest
 from ape.api.networks import LOCAL_NETWORK_NAME
 from ape.contracts import ContractInstance
 from ape.exceptions import ContractLogicError
+from ape.utils import ZERO_ADDRESS
 from ape_ethereum.ecosystem import NETWORKS
+from eth_utils import to_checksum_address
 
 from ape_foundry import FoundryNetworkConfig
+from ape_foundry.prefetch import PrefetchTarget
 from ape_foundry.provider import FoundryForkProvider
+from ape_foundry.proxy import UpstreamProxy, UpstreamStore
+from ape_foundry.state import StateTemplates
 
 TESTS_DIRECTORY = Path(__file__).parent
 TEST_ADDRESS = "0xd8da6bf26964af9d7eed9e03e53415d37aa96045"
@@ -68,6 +73,20 @@ def test_sepolia_impersonate(accounts, sepolia_fork_provider):
     assert receipt.sender == impersonated_account
 
 
+@pytest.mark.fork
+def test_upstream_genesis_cached(mainnet_fork_provider):
+    expected = "0xd4e56740f876aef8c010b86a40d5f56745a118d0906a34e69aec8c0db1cb8fa3"
+    assert mainnet_fork_provider._network_cache.get("genesis:ethereum:mainnet:1") == expected
+    assert mainnet_fork_provider._get_upstream_genesis_hash() == expected
+
+
+@pytest.mark.fork
+def test_poa_decision_cached(mainnet_fork_provider):
+    # Forks keep the upstream genesis, so the decision is re-used.
+    key = f"{mainnet_fork_provider.chain_id}:{mainnet_fork_provider._genesis_hash}"
+    assert mainnet_fork_provider._network_cache.get(key) is False
+
+
 @pytest.mark.fork
 def test_mainnet_impersonate(accounts, mainnet_fork_provider):
     impersonated_account = accounts[TEST_ADDRESS]
@@ -256,6 +275,136 @@ def test_contract_interaction(mainnet_fork_provider, owner, mainnet_fork_contrac
     assert estimate_gas_spy.call_count == 0
 
 
+@pytest.mark.fork
+def test_upstream_proxy_record_and_replay(networks, tmp_path):
+    def get_settings(mode: str) -> dict:
+        fork_config = {
+            "block_number": 21418244,
+            "upstream_mode": mode,
+            "upstream_store": str(tmp_path / "upstream.sqlite"),
+        }
+        return {"host": "http://127.0.0.1:9880", "fork": {"ethereum": {"mainnet": fork_config}}}
+
+    network = networks.ethereum.get_network("mainnet-fork")
+    with network.use_provider("foundry", provider_settings=get_settings("record")) as provider:
+        assert provider.upstream_proxy.uri in provider.build_command()
+        expected = provider.get_balance(TEST_ADDRESS)
+
+    assert len(UpstreamStore(tmp_path / "upstream.sqlite")) > 0
+    with network.use_provider("foundry", provider_settings=get_settings("replay")) as provider:
+        assert provider.get_balance(TEST_ADDRESS) == expected
+        assert provider.upstream_proxy.stats.upstream_requests == 0
+
+
+@pytest.mark.fork
+def test_prefetch_state(mainnet_fork_provider):
+    address = to_checksum_address(TEST_ADDRESS)
+    (state,) = mainnet_fork_provider.prefetch_state([{"address": address, "slots": [0]}])
+    assert state.storage == {0: state.storage[0]}
+    assert mainnet_fork_provider.get_balance(address) == state.balance
+
+
+@pytest.mark.fork
+def test_prefetch_state_error(mainnet_fork_provider, mocker):
+    fork_config = mainnet_fork_provider._fork_config.model_copy(
+        update={"prefetch": [PrefetchTarget(address=ZERO_ADDRESS)]}
+    )
+    mocker.patch.object(
+        FoundryForkProvider,
+        "_fork_config",
+        new_callable=mocker.PropertyMock,
+        return_value=fork_config,
+    )
+    mocker.patch.object(
+        FoundryForkProvider, "prefetch_state", side_effect=ConnectionError("upstream is down")
+    )
+    warning = mocker.patch("ape_foundry.provider.logger.warning")
+
+    # Anvil is still set up, rather than left running with connect() failing.
+    mainnet_fork_provider._set_up_started_node()
+    warning.assert_called_once_with("Unable to prefetch fork state: upstream is down")
+
+
+@pytest.mark.fork
+def test_iter_fork_blocks(mainnet_fork_provider, mocker, tmp_path):
+    mocker.patch.object(
+        FoundryForkProvider,
+        "_fork_states",
+        new_callable=mocker.PropertyMock,
+        return_value=StateTemplates(tmp_path),
+    )
+    load_spy = mocker.spy(FoundryForkProvider, "load_state")
+    warmup = mocker.MagicMock()
+    blocks = [21418242, 21418243, 21418242]
+    try:
+        for block_number in mainnet_fork_provider.iter_fork_blocks(blocks, warmup=warmup):
+            assert mainnet_fork_provider.get_block("latest").number == block_number
+
+    finally:
+        mainnet_fork_provider.reset_fork()
+
+    # The first block's state was loaded when visited again.
+    assert warmup.call_count == 2
+    assert load_spy.call_count == 1
+
+
+@pytest.mark.fork
+def test_reset_fork_load_saved_state(mainnet_fork_provider, mocker, tmp_path):
+    mocker.patch.object(
+        FoundryForkProvider,
+        "_fork_states",
+        new_callable=mocker.PropertyMock,
+        return_value=StateTemplates(tmp_path),
+    )
+    load_spy = mocker.spy(FoundryForkProvider, "load_state")
+    block_number = 21418242
+    try:
+        mainnet_fork_provider.reset_fork(block_number=block_number)
+        mainnet_fork_provider.save_fork_state()
+
+        # Saved states are only loaded when asked to.
+        mainnet_fork_provider.reset_fork(block_number=block_number)
+        assert load_spy.call_count == 0
+        mainnet_fork_provider.reset_fork(block_number=block_number, load_saved_state=True)
+        assert load_spy.call_count == 1
+
+    finally:
+        mainnet_fork_provider.reset_fork()
+
+    # A different fork config does not share the saved state.
+    key = mainnet_fork_provider._get_fork_state_key(block_number)
+    fork_config = mainnet_fork_provider._fork_config.model_copy(update={"upstream_rate_limit": 1})
+    mocker.patch.object(
+        FoundryForkProvider,
+        "_fork_config",
+        new_callable=mocker.PropertyMock,
+        return_value=fork_config,
+    )
+    assert mainnet_fork_provider._get_fork_state_key(block_number) != key
+
+
+@pytest.mark.fork
+def test_state_template_key_across_proxies(mainnet_fork_provider, mocker, tmp_path):
+    keys = []
+    for _ in range(2):
+        # Each proxy listens on a new port, as in separate sessions.
+        proxy = UpstreamProxy(UpstreamStore(tmp_path / "upstream.sqlite"), mode="replay")
+        proxy.start()
+        mocker.patch.object(
+            FoundryForkProvider,
+            "upstream_proxy",
+            new_callable=mocker.PropertyMock,
+            return_value=proxy,
+        )
+        try:
+            assert proxy.uri in mainnet_fork_provider.build_command()
+            keys.append(mainnet_fork_provider.state_template_key)
+        finally:
+            proxy.stop()
+
+    assert keys[0] == keys[1]
+
+
 def test_fork_config_none():
     cfg = FoundryNetworkConfig.model_validate({"fork": None})
     assert isinstance(cfg["fork"], dict)
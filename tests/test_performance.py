@@ -1,4 +1,18 @@
+import pytest
+from ape import reverts
 from ape.api import ReceiptAPI
+from ape_ethereum.trace import TraceApproach
+from web3 import HTTPProvider
+
+from ape_foundry.trace import AnvilTransactionTrace
+
+
+@pytest.fixture(params=("http", "ipc"))
+def transport_provider(request, project, networks):
+    settings = {"host": "auto", "transport": request.param, "use_daemon": False}
+    with project.temp_config(foundry=settings):
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            yield provider
 
 
 def test_contract_transaction_revert(benchmark, connected_provider, owner, contract_instance):
@@ -16,3 +30,78 @@ def test_contract_transaction_revert(benchmark, connected_provider, owner, contr
     # Was seeing 0.44419266798649915.
     # Seeing 0.2634877339878585 as of https://github.com/ApeWorX/ape-foundry/pull/115
     assert median < 3.5
+
+
+def test_contract_transaction_revert_enrichment(benchmark, owner, contract_instance):
+    def revert():
+        # NOTE: Like an expected revert in a negative-path test.
+        with reverts():
+            contract_instance.setNumber(5, sender=owner)
+
+    benchmark.pedantic(revert, rounds=5, warmup_rounds=1)
+    stats = benchmark.stats
+    median = stats.get("median")
+    assert median < 3.5
+
+
+def test_is_connected(benchmark, connected_provider, mocker):
+    request_spy = mocker.spy(HTTPProvider, "make_request")
+    result = benchmark.pedantic(lambda: connected_provider.is_connected, rounds=100)
+    assert result is True
+
+    # Checking used to re-handshake: `web3_clientVersion` twice and two `eth_getBlockByNumber`
+    # calls (PoA check) per check, so 400 requests for these rounds. Now, it makes none.
+    assert request_spy.call_count == 0
+    stats = benchmark.stats
+    median = stats.get("median")
+    assert median < 0.001
+
+
+def test_snapshot_and_restore(benchmark, transport_provider):
+    benchmark.group = "snapshot_and_restore"
+    result = benchmark.pedantic(
+        lambda: transport_provider.restore(transport_provider.snapshot()),
+        rounds=100,
+        warmup_rounds=5,
+    )
+    assert result is True
+    stats = benchmark.stats
+    median = stats.get("median")
+    assert median < 0.05
+
+
+def test_simple_request(benchmark, transport_provider):
+    benchmark.group = "simple_request"
+    result = benchmark.pedantic(
+        lambda: transport_provider.make_request("eth_blockNumber", []),
+        rounds=100,
+        warmup_rounds=5,
+    )
+    assert result is not None
+    stats = benchmark.stats
+    median = stats.get("median")
+    assert median < 0.01
+
+
+@pytest.mark.parametrize("approach", (TraceApproach.PARITY, TraceApproach.GETH_CALL_TRACER))
+def test_get_calltree(benchmark, connected_provider, contract_a, owner, approach):
+    benchmark.group = "get_calltree"
+    receipt = contract_a.methodWithoutArguments(sender=owner)
+
+    def clear_cache():
+        # NOTE: Traces are cached per transaction by the provider too.
+        if (cache := connected_provider.trace_cache) is not None:
+            cache.clear()
+
+    def get_calltree():
+        # NOTE: A new trace each round so nothing is cached.
+        trace = AnvilTransactionTrace(
+            transaction_hash=receipt.txn_hash, call_trace_approach=approach
+        )
+        return trace.get_calltree()
+
+    calltree = benchmark.pedantic(get_calltree, setup=clear_cache, rounds=20, warmup_rounds=2)
+    assert calltree.calls  # Sanity check.
+    stats = benchmark.stats
+    median = stats.get("median")
+    assert median < 0.5
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+from ape_foundry.pool import AnvilPool, PoolMember, command_key, get_reset_requests, with_port
+
+COMMAND = ["/usr/bin/anvil", "--port", "8545", "--accounts", "10"]
+
+
+def test_with_port():
+    assert with_port(COMMAND, 9000) == ["/usr/bin/anvil", "--port", "9000", "--accounts", "10"]
+    assert with_port(["anvil"], 9000) == ["anvil", "--port", "9000"]
+
+
+def test_command_key():
+    # Port and binary location do not affect the key.
+    other_port = with_port(COMMAND, 9000)
+    other_bin = ["/opt/anvil", *COMMAND[1:]]
+    assert command_key(COMMAND) == command_key(other_port) == command_key(other_bin)
+    assert command_key(COMMAND) != command_key([*COMMAND, "--no-mining"])
+
+
+def test_get_reset_requests():
+    requests = dict(get_reset_requests(COMMAND))
+    assert requests["evm_setAutomine"] == [True]
+    assert requests["anvil_autoImpersonateAccount"] == [False]
+    assert requests["anvil_setLoggingEnabled"] == [True]
+
+    requests = dict(get_reset_requests([*COMMAND, "--no-mining", "--block-time", "10"]))
+    assert requests["evm_setIntervalMining"] == [10]
+    assert "evm_setAutomine" not in requests
+
+
+def test_process_pool(project, networks):
+    with project.temp_config(foundry={"host": "auto", "process_pool_size": 1}):
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            member = provider._pool_member
+            assert member is not None
+            assert provider.uri == member.uri
+            provider.mine(5)
+            assert provider.get_block("latest").number == 5
+
+        # Released back to the pool.
+        assert provider._pool_member is None
+
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            # Leased a pre-started node, reset to its initial state.
+            assert provider._pool_member is not None
+            assert provider.get_block("latest").number == 0
+            provider.auto_mine = False
+
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            # Node settings were restored too.
+            assert provider.auto_mine
+
+
+def test_reclaim_orphaned_lease(tmp_path, mocker):
+    pool = AnvilPool(tmp_path, COMMAND, 1)
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    member = PoolMember(pid=os.getpid(), port=8545, snapshot="0x0", owner=exited.pid)
+    pool.leased_path.mkdir(parents=True)
+    (pool.leased_path / member.file_name).write_text(member.model_dump_json())
+    mocker.patch.object(PoolMember, "is_alive", new_callable=mocker.PropertyMock, return_value=True)
+    reset = mocker.patch.object(AnvilPool, "_reset")
+
+    # The lessee exited without releasing it, so it is reset and leased again.
+    claimed = pool.claim()
+    assert claimed is not None
+    assert claimed.port == member.port
+    assert claimed.owner == os.getpid()
+    assert reset.call_count == 1
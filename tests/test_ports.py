@@ -0,0 +1,49 @@
+import json
+import socket
+
+import pytest
+
+from ape_foundry.ports import WORKER_PORT_STRIDE, PortRegistry
+
+START = 50000
+END = 50999
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return PortRegistry(tmp_path / "ports.json", START, END)
+
+
+def test_lease_from_worker_id(registry):
+    port = registry.lease(worker_id="gw3")
+    assert port == START + 3 * WORKER_PORT_STRIDE
+
+    # The next lease for the same worker skips the leased port.
+    assert registry.lease(worker_id="gw3") == port + 1
+
+
+def test_lease_skips_bound_port(registry):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", START))
+        assert registry.lease(worker_id="gw0") == START + 1
+
+
+def test_lease_exclude(registry):
+    assert registry.lease(exclude=[START], worker_id="gw0") == START + 1
+
+
+def test_release(registry):
+    port = registry.lease(worker_id="gw0")
+    registry.release(port)
+    assert registry.lease(worker_id="gw0") == port
+
+
+def test_leases_of_dead_processes_are_dropped(registry):
+    registry.path.write_text(json.dumps({f"{START}": {"pid": 2**22 + 1, "worker": "gw0"}}))
+    assert registry.lease(worker_id="gw0") == START
+
+
+def test_leases_visible_across_instances(registry):
+    port = registry.lease(worker_id="gw0")
+    other = PortRegistry(registry.path, START, END)
+    assert other.lease(worker_id="gw0") != port
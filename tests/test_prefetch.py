@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from ape_foundry.exceptions import FoundryBatchError
+from ape_foundry.prefetch import PrefetchTarget, fetch_state
+
+ADDRESS = "0x274b028b03A250cA03644E6c578D81f019eE1323"
+
+
+def test_storage_slots():
+    target = PrefetchTarget(address=ADDRESS, slots=["0x10", 2], slot_ranges=[[0, 3]])
+    assert target.storage_slots == [0, 1, 2, 16]
+
+
+def test_fetch_state():
+    batches = []
+    lock = threading.Lock()
+
+    def send(requests):
+        with lock:
+            batches.append(requests)
+
+        results = {
+            "eth_getBalance": "0x64",
+            "eth_getTransactionCount": "0x2",
+            "eth_getCode": "0x6001",
+        }
+        return [
+            {"result": results.get(method, f"0x{int(params[1], 16):064x}")}
+            for method, params in requests
+        ]
+
+    target = {"address": ADDRESS, "slot_ranges": [[0, 4]]}
+    (state,) = fetch_state(send, [target], 16, batch_size=2)
+    assert state.balance == 100
+    assert state.nonce == 2
+    assert state.code == "0x6001"
+    assert state.storage == {i: f"0x{i:064x}" for i in range(4)}
+
+    # 3 account requests and 4 storage requests, in batches of 2.
+    assert len(batches) == 4
+    assert all(p[-1] == "0x10" for batch in batches for _, p in batch)
+
+
+def test_fetch_state_error():
+    def send(requests):
+        return [{"error": {"message": "header not found"}} for _ in requests]
+
+    with pytest.raises(FoundryBatchError):
+        fetch_state(send, [ADDRESS], "0x10")
@@ -0,0 +1,86 @@
+import socket
+import sys
+import time
+from subprocess import Popen
+
+import pytest
+
+from ape_foundry.exceptions import FoundrySubprocessError
+from ape_foundry.process import AnvilReadinessProbe, LogTail
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "stdout.log"
+    path.write_text("Listening on 127.0.0.1:8545\n")  # Stale output from a previous run.
+    return path
+
+
+@pytest.fixture
+def listening_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_log_tail_skips_existing_content(log_path):
+    tail = LogTail(log_path)
+    assert tail.read_lines() == []
+
+    with open(log_path, "a") as file:
+        file.write("first\nsec")
+
+    assert tail.read_lines() == ["first"]
+    with open(log_path, "a") as file:
+        file.write("ond\n")
+
+    assert tail.read_lines() == ["second"]
+    assert tail.read_lines() == []
+
+
+def test_log_tail_recreated_file(log_path):
+    tail = LogTail(log_path)
+    log_path.unlink()
+    log_path.write_text("new\n")
+    assert tail.read_lines() == ["new"]
+
+
+def test_readiness_probe_port_open(listening_port):
+    probe = AnvilReadinessProbe(listening_port)
+    assert probe.wait(1) is True
+
+
+def test_readiness_probe_log_line(log_path, closed_port):
+    probe = AnvilReadinessProbe(closed_port, log_path=log_path)
+    assert probe.wait(0.05) is False  # Ignores stale output.
+
+    with open(log_path, "a") as file:
+        file.write(f"Listening on 127.0.0.1:{closed_port}\n")
+
+    assert probe.wait(1) is True
+
+
+def test_readiness_probe_deadline(closed_port):
+    probe = AnvilReadinessProbe(closed_port)
+    start = time.monotonic()
+    assert probe.wait(0.2) is False
+    assert time.monotonic() - start < 1
+
+
+def test_readiness_probe_process_exited(closed_port):
+    process = Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+    process.wait()
+    probe = AnvilReadinessProbe(closed_port, process=process)
+    with pytest.raises(FoundrySubprocessError, match="exited with code '3'"):
+        probe.wait(1)
@@ -2,19 +2,24 @@ import os
 
 import pytest
 from ape import convert, reverts
-from ape.api import TraceAPI
+from ape.api import TraceAPI, TransactionAPI
 from ape.api.accounts import ImpersonatedAccount
 from ape.contracts import ContractContainer
 from ape.exceptions import ContractLogicError, TransactionError, VirtualMachineError
 from ape_ethereum.trace import Trace
-from ape_ethereum.transactions import TransactionStatusEnum, TransactionType
+from ape_ethereum.transactions import Receipt, TransactionStatusEnum, TransactionType
 from eth_pydantic_types import HexBytes32
-from eth_utils import to_hex, to_int
+from eth_utils import to_checksum_address, to_hex, to_int
 from evm_trace import CallType
 from hexbytes import HexBytes
+from web3 import HTTPProvider, IPCProvider
 
-from ape_foundry import FoundryProviderError
+from ape_foundry import FoundryBatchError, FoundryProviderError
+from ape_foundry.pool import AnvilPool
+from ape_foundry.ports import PortRegistry
+from ape_foundry.process import AnvilReadinessProbe
 from ape_foundry.provider import FOUNDRY_CHAIN_ID
+from ape_foundry.trace import AnvilTransactionTrace
 
 TEST_WALLET_ADDRESS = "0xD9b7fdb3FC0A0Aa3A507dCf0976bc23D49a9C7A3"
 
@@ -164,6 +169,13 @@ def test_request_timeout(connected_provider, project):
         assert connected_provider.timeout == 30
 
 
+def test_poa_decision_not_cached_locally(connected_provider):
+    # Each local node has a new genesis, so its decision is never re-used.
+    assert connected_provider._genesis_hash is not None
+    key = f"{connected_provider.chain_id}:{connected_provider._genesis_hash}"
+    assert connected_provider._network_cache.get(key) is None
+
+
 def test_contract_interaction(connected_provider, owner, contract_instance, mocker):
     # Spy on the estimate_gas RPC method.
     estimate_gas_spy = mocker.spy(connected_provider.web3.eth, "estimate_gas")
@@ -203,6 +215,28 @@ def test_contract_revert_no_message(owner, contract_instance):
         contract_instance.setNumber(5, sender=owner)
 
 
+def test_revert_shows_trace(sender, contract_instance, mocker):
+    show_spy = mocker.spy(Receipt, "show_trace")
+    with pytest.raises(ContractLogicError, match="!authorized") as err:
+        contract_instance.setNumber(6, sender=sender, gas_limit=200_000)
+
+    assert isinstance(err.value.txn, TransactionAPI)
+    assert show_spy.call_count == 1
+
+
+def test_custom_error_decoded_without_tracing(
+    error_contract, connected_provider, mocker, not_owner
+):
+    connected_provider._clear_trace_cache()
+    addresses_spy = mocker.spy(AnvilTransactionTrace, "get_addresses_used")
+    with pytest.raises(error_contract.Unauthorized) as err:
+        error_contract.withdraw(sender=not_owner)
+
+    # Decoded from the revert data, without tracing the addresses used.
+    assert err.value.inputs["addr"] == not_owner.address
+    assert addresses_spy.call_count == 0
+
+
 def test_transaction_contract_as_sender(
     contract_instance, contract_container, connected_provider, owner
 ):
@@ -241,6 +275,82 @@ def test_set_storage(connected_provider, contract_container, owner):
     assert to_int(connected_provider.get_storage(contract.address, "0x2b5e3af16b1880000")) == 1
 
 
+def test_dump_and_load_state(connected_provider, vyper_contract_container, owner):
+    contract = vyper_contract_container.deploy(sender=owner)
+    code = connected_provider.get_code(contract.address)
+    state = connected_provider.dump_state()
+
+    connected_provider.set_code(contract.address, "0x00")
+    assert connected_provider.load_state(state) is True
+    assert connected_provider.get_code(contract.address) == code
+
+
+def test_state_template(connected_provider, vyper_contract_container, owner):
+    with connected_provider.state_template("test_state_template") as loaded:
+        assert not loaded
+        contract = vyper_contract_container.deploy(sender=owner)
+
+    code = connected_provider.get_code(contract.address)
+    connected_provider.set_code(contract.address, "0x00")
+    with connected_provider.state_template("test_state_template") as loaded:
+        assert loaded
+
+    assert connected_provider.get_code(contract.address) == code
+
+
+def test_daemon(project, networks):
+    def processes(members):
+        # NOTE: Snapshot IDs change each time a daemon is reset.
+        return [(m.pid, m.port) for m in members]
+
+    with project.temp_config(foundry={"host": "auto"}):
+        daemon_provider = networks.ethereum.local.get_provider("foundry")
+        daemons = daemon_provider.start_daemon()
+        try:
+            assert len(daemons) == 1
+            with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+                # Attached to the daemon rather than starting a process.
+                assert provider.uri == daemons[0].uri
+                assert provider.process is None
+                provider.mine(3)
+
+            # The daemon is still running but was reset.
+            assert processes(daemon_provider.start_daemon()) == processes(daemons)
+            with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+                assert provider.uri == daemons[0].uri
+                assert provider.get_block("latest").number == 0
+
+        finally:
+            assert processes(daemon_provider.stop_daemon()) == processes(daemons)
+
+
+def test_daemon_leases_no_port(project, networks, mocker):
+    with project.temp_config(foundry={"host": "auto"}):
+        daemon_provider = networks.ethereum.local.get_provider("foundry")
+        daemons = daemon_provider.start_daemon()
+        lease_spy = mocker.spy(PortRegistry, "lease")
+        try:
+            with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+                assert provider.uri == daemons[0].uri
+                assert provider._port_lease is None
+
+            # Only processes started by the provider lease a port.
+            assert lease_spy.call_count == 0
+
+        finally:
+            daemon_provider.stop_daemon()
+
+
+def test_start_without_daemon(project, networks, mocker):
+    claim_spy = mocker.spy(AnvilPool, "claim")
+    with project.temp_config(foundry={"host": "auto"}):
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            assert provider.process is not None
+
+    # No daemon was started, so none was looked for.
+    assert claim_spy.call_count == 0
+
+
 def test_return_value(connected_provider, contract_instance, owner):
     tx = contract_instance.setAddress(owner, sender=owner)
     actual = tx.return_value
@@ -255,6 +365,54 @@ def test_return_value_tx_with_subcalls(connected_provider, contract_a, owner):
     assert actual == expected
 
 
+def test_return_value_only_top_call(connected_provider, contract_instance, owner, mocker):
+    connected_provider._clear_trace_cache()
+    request_spy = mocker.spy(type(connected_provider), "make_request")
+    tx = contract_instance.setAddress(owner, sender=owner)
+    assert tx.return_value == 123
+
+    # Only the top-level call is traced, not the whole transaction.
+    methods = [c[0][1] for c in request_spy.call_args_list]
+    assert "trace_transaction" not in methods
+    trace_params = [
+        c[0][2][1] for c in request_spy.call_args_list if c[0][1] == "debug_traceTransaction"
+    ]
+    assert trace_params == [{"tracer": "callTracer", "tracerConfig": {"onlyTopCall": True}}]
+
+    # The method ABI is cached per address and selector.
+    selector = to_hex(tx.transaction.data[:4])
+    assert (contract_instance.address.lower(), selector) in connected_provider._method_abis
+
+
+def test_method_abi_miss_not_cached(connected_provider, contract_instance, owner, mocker):
+    tx = contract_instance.setAddress(owner, sender=owner)
+    address = contract_instance.address
+    calldata = to_hex(tx.transaction.data)
+    key = (address.lower(), calldata[:10])
+    connected_provider._method_abis.clear()
+
+    # Not yet known, such as before its contract type is cached.
+    contracts = type(connected_provider.chain_manager.contracts)
+    patch = mocker.patch.object(contracts, "__getitem__", side_effect=KeyError(address))
+    assert tx.trace._get_method_abi(address, calldata) is None
+    assert key not in connected_provider._method_abis
+
+    # Resolved once known.
+    patch.stop()
+    assert tx.trace._get_method_abi(address, calldata) is not None
+    assert key in connected_provider._method_abis
+
+
+def test_return_value_failed(connected_provider, error_contract, not_owner):
+    connected_provider._clear_trace_cache()
+    receipt = error_contract.withdraw(sender=not_owner, raise_on_revert=False)
+    assert receipt.failed
+
+    # The revert data is not decoded as the method's return value.
+    assert receipt.trace._get_top_level_call()[2] is None
+    assert receipt.return_value is None
+
+
 def test_get_receipt(connected_provider, contract_instance, owner):
     receipt = contract_instance.setAddress(owner.address, sender=owner)
     actual = connected_provider.get_receipt(receipt.txn_hash)
@@ -304,6 +462,15 @@ def test_host(project, local_network, host):
         assert provider.uri == "https://example.com"
 
 
+def test_readiness_probe_host(project, networks, mocker):
+    probe_spy = mocker.patch("ape_foundry.provider.AnvilReadinessProbe", wraps=AnvilReadinessProbe)
+    with project.temp_config(foundry={"host": "http://localhost:8556", "use_daemon": False}):
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True):
+            pass
+
+    assert probe_spy.call_args.kwargs["host"] == "localhost"
+
+
 def test_base_fee(connected_provider, project, networks, accounts):
     assert connected_provider.base_fee == 0
 
@@ -505,3 +672,127 @@ def test_optimism(networks):
         assert provider.is_connected
         cmd = provider.build_command()
         assert "--optimism" in cmd
+
+
+def test_ipc_transport(project, networks):
+    with project.temp_config(foundry={"host": "auto", "transport": "ipc", "use_daemon": False}):
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            assert isinstance(provider.web3.provider, IPCProvider)
+            assert provider._ipc_path is not None
+            assert provider._ipc_path.exists()
+            snapshot = provider.snapshot()
+            provider.mine(2)
+            provider.restore(snapshot)
+            assert provider.get_block("latest").number == 0
+
+            # HTTP is still served for external tools.
+            response = HTTPProvider(provider.uri).make_request("eth_chainId", [])
+            assert int(response["result"], 16) == provider.chain_id
+
+        assert provider._ipc_path is None
+
+
+def test_http_session(connected_provider):
+    connected_provider.make_request("eth_blockNumber", [])
+    before = connected_provider.http_session_stats
+    for _ in range(10):
+        connected_provider.make_request("eth_blockNumber", [])
+
+    after = connected_provider.http_session_stats
+    assert after.requests - before.requests == 10
+    assert after.connections_opened == before.connections_opened
+    assert after.connections_reused - before.connections_reused == 10
+
+
+def test_trace_cache(connected_provider, contract_instance, owner):
+    tx = contract_instance.setNumber(321, sender=owner)
+    before = connected_provider.trace_cache_stats
+    connected_provider.get_transaction_trace(tx.txn_hash).get_calltree()
+    connected_provider.get_transaction_trace(tx.txn_hash).get_calltree()
+    after = connected_provider.trace_cache_stats
+    assert after.misses - before.misses == 1
+    assert after.hits - before.hits == 1
+
+    # Cleared when the chain's history may change.
+    connected_provider.restore(connected_provider.snapshot())
+    assert connected_provider.trace_cache_stats.entries == 0
+
+
+def test_get_transaction_traces(connected_provider, contract_instance, owner, mocker):
+    receipts = [contract_instance.setNumber(i + 1, sender=owner) for i in range(3)]
+    connected_provider._clear_trace_cache()
+    batch_spy = mocker.spy(type(connected_provider), "_make_batch_request")
+    traces = connected_provider.get_transaction_traces([r.txn_hash for r in receipts])
+    assert batch_spy.call_count == 1
+    assert [t.transaction_hash for t in traces] == [r.txn_hash for r in receipts]
+
+    # The calltrees are built from the batched data.
+    request_spy = mocker.spy(type(connected_provider), "make_request")
+    assert all(t.get_calltree().address == contract_instance.address for t in traces)
+    assert request_spy.call_count == 0
+
+
+def test_trace_blocks(connected_provider, contract_instance, owner, mocker):
+    receipts = [contract_instance.setNumber(i + 1, sender=owner) for i in range(3)]
+    connected_provider._clear_trace_cache()
+    traces = connected_provider.trace_blocks(receipts[0].block_number, receipts[-1].block_number)
+    assert [t.transaction_hash for t in traces] == [r.txn_hash for r in receipts]
+
+    # Later traces of the same transactions are served from the cache.
+    request_spy = mocker.spy(type(connected_provider), "make_request")
+    for receipt in receipts:
+        connected_provider.get_transaction_trace(receipt.txn_hash).get_calltree()
+
+    assert request_spy.call_count == 0
+
+
+def test_trace_prefetch_blocks(project, connected_provider, contract_instance, owner, mocker):
+    receipts = [contract_instance.setNumber(i + 1, sender=owner) for i in range(3)]
+    connected_provider._clear_trace_cache()
+    request_spy = mocker.spy(type(connected_provider), "make_request")
+    batch_spy = mocker.spy(type(connected_provider), "_make_batch_request")
+    with project.temp_config(foundry={"trace_prefetch_blocks": 32}):
+        for receipt in receipts:
+            connected_provider.get_transaction_trace(receipt.txn_hash).get_calltree()
+
+    # The first trace fetched the following blocks' traces too.
+    trace_requests = [c for c in request_spy.call_args_list if c[0][1] == "trace_transaction"]
+    assert not trace_requests
+
+    # Only up to the latest block.
+    blocks = [int(params[0], 16) for _, params in batch_spy.call_args_list[0][0][1]]
+    assert blocks == list(range(receipts[0].block_number, receipts[-1].block_number + 1))
+
+
+def test_batch_requests(connected_provider, mocker):
+    batch_spy = mocker.spy(HTTPProvider, "make_batch_request")
+    addresses = [to_checksum_address(f"0x{i:040x}") for i in range(1, 51)]
+    with connected_provider.batch_requests(size=20) as batch:
+        for idx, address in enumerate(addresses):
+            connected_provider.set_balance(address, idx + 1)
+
+        # Not sent until exiting the context.
+        assert len(batch.pending) == len(addresses)
+        assert connected_provider.get_balance(addresses[0]) == 0
+
+    assert batch_spy.call_count == 3
+    assert connected_provider.get_balance(addresses[0]) == 1
+    assert connected_provider.get_balance(addresses[-1]) == len(addresses)
+
+
+def test_batch_requests_error(connected_provider, owner):
+    with pytest.raises(FoundryBatchError) as err:
+        with connected_provider.batch_requests():
+            connected_provider.set_balance(owner.address, "1000 ETH")
+            connected_provider.unlock_account("0x123")  # type: ignore[arg-type]
+
+    assert [r.index for r in err.value.failed] == [1]
+    assert err.value.failed[0].method == "anvil_impersonateAccount"
+
+
+def test_ws_transport(project, networks):
+    with project.temp_config(foundry={"host": "auto", "transport": "ws", "use_daemon": False}):
+        with networks.ethereum.local.use_provider("foundry", disconnect_after=True) as provider:
+            assert provider.web3.provider.endpoint_uri == provider.ws_uri
+            provider.mine(2)
+            assert provider.get_block("latest").number == 2
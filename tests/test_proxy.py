@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from signal import SIGTERM
+
+import pytest
+import requests
+
+from ape_foundry.exceptions import FoundryProviderError
+from ape_foundry.proxy import (
+    RateLimiter,
+    UpstreamProxy,
+    UpstreamStore,
+    get_shared_proxy_uri,
+    is_historical,
+)
+
+ADDRESS = "0x274b028b03A250cA03644E6c578D81f019eE1323"
+BALANCE = "0xde0b6b3a7640000"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay: float = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.delay)
+        body = f'{{"jsonrpc": "2.0", "id": 1, "result": "{BALANCE}"}}'.encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def upstream_uri():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return tmp_path / "upstream.sqlite"
+
+
+def get_balance(uri: str, block: str = "0x10") -> dict:
+    params = [ADDRESS, block]
+    payload = {"jsonrpc": "2.0", "id": 7, "method": "eth_getBalance", "params": params}
+    return requests.post(uri, json=payload).json()
+
+
+def test_record_and_replay(upstream_uri, store_path):
+    proxy = UpstreamProxy(UpstreamStore(store_path), upstream_uri, mode="record")
+    try:
+        response = get_balance(proxy.start())
+    finally:
+        proxy.stop()
+
+    assert response["result"] == BALANCE
+    assert proxy.stats.upstream_requests == 1
+    assert len(UpstreamStore(store_path)) == 1
+
+    proxy = UpstreamProxy(UpstreamStore(store_path), mode="replay")
+    try:
+        response = get_balance(proxy.start())
+        missing = get_balance(proxy.uri, block="0x11")
+    finally:
+        proxy.stop()
+
+    assert response == {"jsonrpc": "2.0", "id": 7, "result": BALANCE}
+    assert "No recorded response for 'eth_getBalance'" in missing["error"]["message"]
+    assert proxy.stats.hits == 1
+    assert proxy.stats.misses == 1
+    assert proxy.stats.upstream_requests == 0
+
+
+def test_record_requires_upstream(store_path):
+    with pytest.raises(FoundryProviderError, match="Upstream URI required to record."):
+        UpstreamProxy(UpstreamStore(store_path), mode="record")
+
+
+def test_cache(upstream_uri, store_path):
+    proxy = UpstreamProxy(UpstreamStore(store_path), upstream_uri, mode="cache")
+    try:
+        uri = proxy.start()
+        for _ in range(3):
+            assert get_balance(uri)["result"] == BALANCE
+
+        # Not historical, so always requested.
+        get_balance(uri, block="latest")
+        get_balance(uri, block="latest")
+    finally:
+        proxy.stop()
+
+    assert proxy.stats.hits == 2
+    assert proxy.stats.misses == 1
+    assert proxy.stats.upstream_requests == 3
+    assert len(UpstreamStore(store_path)) == 1
+
+
+def test_coalesce(upstream_uri, store_path, monkeypatch):
+    monkeypatch.setattr(Handler, "delay", 0.2)
+    proxy = UpstreamProxy(UpstreamStore(store_path), upstream_uri, mode="cache")
+    request = {"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []}
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            responses = list(executor.map(proxy.handle, [request] * 8))
+    finally:
+        proxy.stop()
+
+    assert all(r["result"] == BALANCE for r in responses)
+    assert proxy.stats.coalesced == 7
+    assert proxy.stats.upstream_requests == 1
+
+
+def test_is_historical():
+    assert is_historical("eth_getBalance", [ADDRESS, "0x10"])
+    assert is_historical("eth_getStorageAt", [ADDRESS, "0x0", {"blockHash": "0x" + "ab" * 32}])
+    assert is_historical("eth_getLogs", [{"fromBlock": "0x1", "toBlock": "0x10"}])
+    assert is_historical("eth_getTransactionReceipt", ["0x" + "ab" * 32])
+    assert not is_historical("eth_getBalance", [ADDRESS, "latest"])
+    assert not is_historical("eth_blockNumber", [])
+
+    # Without a block, requests are for the latest block.
+    assert not is_historical("eth_getBalance", [ADDRESS])
+    assert not is_historical("eth_call", [{"to": ADDRESS, "data": "0x"}])
+    assert not is_historical("eth_getStorageAt", [ADDRESS, "0x0"])
+    assert not is_historical("eth_getLogs", [{"fromBlock": "0x1"}])
+    assert not is_historical("eth_getLogs", [{"fromBlock": "0x1", "toBlock": "safe"}])
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+
+    assert time.monotonic() - start >= 0.19
+
+
+def test_shared_proxy(upstream_uri, tmp_path, store_path):
+    uri = get_shared_proxy_uri(tmp_path / "proxies", upstream_uri, store_path)
+    try:
+        assert get_shared_proxy_uri(tmp_path / "proxies", upstream_uri, store_path) == uri
+        assert get_balance(uri)["result"] == BALANCE
+        assert get_balance(uri)["result"] == BALANCE
+    finally:
+        info = json.loads(next((tmp_path / "proxies").glob("*/proxy.json")).read_text())
+        os.kill(info["pid"], SIGTERM)
+
+    assert len(UpstreamStore(store_path)) == 1
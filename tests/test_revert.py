@@ -0,0 +1,33 @@
+from eth_abi import encode
+from eth_utils import keccak, to_hex
+from web3.exceptions import ContractLogicError as Web3ContractLogicError
+
+from ape_foundry.revert import ERROR_STRING_SELECTOR, ErrorSelectorIndex, get_revert_data
+
+ADDRESS = "0x274b028b03A250cA03644E6c578D81f019eE1323"
+UNAUTHORIZED = keccak(text="Unauthorized(address,uint256)")[:4] + encode(
+    ["address", "uint256"], [ADDRESS, 5]
+)
+
+
+def test_decode(get_contract_type):
+    index = ErrorSelectorIndex([get_contract_type("has_error")])
+    assert len(index) == 2
+    assert UNAUTHORIZED in index
+    assert index.decode(UNAUTHORIZED) == f"Unauthorized(addr={ADDRESS}, counter=5)"
+
+
+def test_decode_error_string():
+    data = ERROR_STRING_SELECTOR + encode(["string"], ["!authorized"])
+    assert ErrorSelectorIndex().decode(data) == "!authorized"
+
+
+def test_decode_unknown_selector():
+    assert ErrorSelectorIndex().decode(UNAUTHORIZED) is None
+
+
+def test_get_revert_data():
+    data = to_hex(UNAUTHORIZED)
+    assert get_revert_data(Web3ContractLogicError("execution reverted", data=data)) == UNAUTHORIZED
+    assert get_revert_data(Web3ContractLogicError("execution reverted", data=None)) is None
+    assert get_revert_data(Web3ContractLogicError("execution reverted", data="0x")) is None
@@ -0,0 +1,48 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ape_foundry.session import create_session, session_stats
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"jsonrpc": "2.0", "id": 0, "result": "0x0"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server_uri():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("keep_alive", (True, False))
+def test_session_stats(server_uri, keep_alive):
+    session = create_session(keep_alive=keep_alive)
+    for _ in range(5):
+        session.post(server_uri, json={"method": "eth_blockNumber"}).raise_for_status()
+
+    stats = session_stats(session)
+    assert stats.requests == 5
+    if keep_alive:
+        assert stats.connections_opened == 1
+        assert stats.connections_reused == 4
+    else:
+        assert stats.connections_opened == 5
+        assert stats.connections_reused == 0
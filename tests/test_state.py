@@ -0,0 +1,35 @@
+import gzip
+
+from ethpm_types import ContractType
+
+from ape_foundry.state import StateTemplates, state_key
+
+
+def test_save_and_load(tmp_path):
+    templates = StateTemplates(tmp_path)
+    assert templates.load("fixtures", "abc") is None
+
+    path = templates.save("fixtures", "abc", b'{"block": 1}')
+    assert path.name == "fixtures-abc.state.gz"
+    assert gzip.decompress(templates.load("fixtures", "abc")) == b'{"block": 1}'
+
+
+def test_save_already_compressed(tmp_path):
+    templates = StateTemplates(tmp_path)
+    state = gzip.compress(b'{"block": 1}')
+    templates.save("fixtures", "abc", state)
+    assert templates.load("fixtures", "abc") == state
+
+
+def test_state_key():
+    contract_a = ContractType(contractName="A", deploymentBytecode={"bytecode": "0x6001"})
+    contract_b = ContractType(contractName="B", deploymentBytecode={"bytecode": "0x6002"})
+    changed_b = ContractType(contractName="B", deploymentBytecode={"bytecode": "0x6003"})
+
+    # Order-independent.
+    assert state_key([contract_a, contract_b], "cfg") == state_key([contract_b, contract_a], "cfg")
+    assert state_key([contract_a, contract_b], "cfg") != state_key([contract_a, changed_b], "cfg")
+    assert state_key([contract_a], "cfg") != state_key([contract_a], "other")
+
+    # Parts are delimited.
+    assert state_key([], "ab", "c") != state_key([], "a", "bc")
@@ -0,0 +1,33 @@
+import io
+import json
+
+import pytest
+
+from ape_foundry.exceptions import FoundryProviderError
+from ape_foundry.streaming import iter_json_items
+
+
+def test_iter_json_items():
+    frames = [{"pc": idx, "op": "PUSH1", "stack": ["0x1"] * idx} for idx in range(100)]
+    response = {"jsonrpc": "2.0", "id": 1, "result": {"gas": 21000, "structLogs": frames}}
+    stream = io.BytesIO(json.dumps(response).encode())
+
+    items = iter_json_items(stream, "result.structLogs.item", buf_size=64)
+    assert next(items) == frames[0]
+
+    # Parsed incrementally: not all of the response has been read yet.
+    assert stream.tell() < len(stream.getvalue())
+    assert list(items) == frames[1:]
+
+
+def test_iter_json_items_error():
+    response = {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "tx not found"}}
+    stream = io.BytesIO(json.dumps(response).encode())
+    with pytest.raises(FoundryProviderError, match="tx not found"):
+        list(iter_json_items(stream, "result.structLogs.item"))
+
+
+def test_iter_json_items_empty():
+    response = {"jsonrpc": "2.0", "id": 1, "result": {"structLogs": []}}
+    stream = io.BytesIO(json.dumps(response).encode())
+    assert list(iter_json_items(stream, "result.structLogs.item")) == []
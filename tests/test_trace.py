@@ -5,9 +5,12 @@ from pathlib import Path
 import pytest
 from ape.exceptions import ContractLogicError
 from ape.utils import create_tempdir
-from eth_utils import to_hex
+from ape_ethereum.trace import TraceApproach
+from eth_utils import keccak, to_hex
 from hexbytes import HexBytes
 
+from ape_foundry.trace import TRACE_DETAIL_PARAMETERS, AnvilTransactionTrace, TraceDetail
+
 from .expected_traces import (
     LOCAL_GAS_REPORT,
     LOCAL_TRACE,
@@ -183,3 +186,100 @@ def test_extract_custom_error_transaction_given_trace_fails(connected_provider,
 
     # Show failure was tracked
     assert tracker[0] == to_hex(HexBytes(tx.txn_hash))
+
+
+def test_raw_trace_frames(connected_provider, local_receipt, mocker):
+    stream_spy = mocker.spy(type(connected_provider), "stream_request")
+    trace = connected_provider.get_transaction_trace(local_receipt.txn_hash)
+    frames = list(trace.raw_trace_frames)
+    assert frames
+    assert stream_spy.call_count == 1
+
+    # Re-used once fully read.
+    assert list(trace.raw_trace_frames) == frames
+    assert stream_spy.call_count == 1
+
+
+def test_raw_trace_frames_too_large_to_cache(connected_provider, local_receipt, mocker):
+    stream_spy = mocker.spy(type(connected_provider), "stream_request")
+    mocker.patch.object(AnvilTransactionTrace, "max_cached_frames", 2)
+    trace = connected_provider.get_transaction_trace(local_receipt.txn_hash)
+    frames = list(trace.raw_trace_frames)
+    assert len(frames) > 2
+
+    # Streamed again rather than kept in memory.
+    assert list(trace.raw_trace_frames) == frames
+    assert stream_spy.call_count == 2
+
+
+def test_get_struct_logs_detail(connected_provider, local_receipt, mocker):
+    stream_spy = mocker.spy(type(connected_provider), "stream_request")
+    trace = connected_provider.get_transaction_trace(local_receipt.txn_hash)
+    cheap_frames = list(trace.get_struct_logs(TraceDetail.OPCODES))
+    assert cheap_frames
+    assert not any(f.get("stack") or f.get("memory") for f in cheap_frames)
+    assert stream_spy.call_count == 1
+    parameters = stream_spy.call_args[0][2][1]
+    assert parameters["disableStack"] is True
+
+    # Upgrades lazily, only when more detail is needed.
+    full_frames = list(trace.get_struct_logs(TraceDetail.FULL))
+    assert len(full_frames) == len(cheap_frames)
+    assert any(f.get("stack") for f in full_frames)
+    assert stream_spy.call_count == 2
+
+    # Lower tiers are served by the cached full frames.
+    assert list(trace.get_struct_logs(TraceDetail.STRUCT_LOGS)) == full_frames
+    assert list(trace.raw_trace_frames) == full_frames
+    assert stream_spy.call_count == 2
+
+
+def test_get_raw_frames_detail(connected_provider, local_receipt, mocker):
+    stream_spy = mocker.spy(type(connected_provider), "stream_request")
+    trace = connected_provider.get_transaction_trace(local_receipt.txn_hash)
+    frames = list(trace.get_raw_frames())
+    assert any(f.get("stack") for f in frames)
+
+    # Source tracebacks and coverage skip memory.
+    method, (_, parameters) = stream_spy.call_args[0][1:3]
+    assert method == "debug_traceTransaction"
+    assert parameters == TRACE_DETAIL_PARAMETERS[TraceDetail.STRUCT_LOGS]
+
+
+def test_revert_data_from_top_call(connected_provider, error_contract, not_owner, mocker):
+    receipt = error_contract.withdraw(sender=not_owner, raise_on_revert=False)
+    request_spy = mocker.spy(type(connected_provider), "make_request")
+    stream_spy = mocker.spy(type(connected_provider), "stream_request")
+    trace = connected_provider.get_transaction_trace(receipt.txn_hash)
+    revert_data = trace._revert_str_from_trace_frames
+    assert revert_data[:4] == keccak(text="Unauthorized(address,uint256)")[:4]
+    assert trace._return_data_from_trace_frames is None
+
+    # Only the top-level call is traced, with no struct logs.
+    assert stream_spy.call_count == 0
+    trace_params = [
+        c[0][2][1] for c in request_spy.call_args_list if c[0][1] == "debug_traceTransaction"
+    ]
+    assert trace_params == [{"tracer": "callTracer", "tracerConfig": {"onlyTopCall": True}}]
+
+
+def test_call_tracer_approach(connected_provider, local_receipt):
+    parity_trace = connected_provider.get_transaction_trace(local_receipt.txn_hash)
+    geth_trace = connected_provider.get_transaction_trace(
+        local_receipt.txn_hash, call_trace_approach=TraceApproach.GETH_CALL_TRACER
+    )
+    expected = parity_trace.get_calltree()
+    actual = geth_trace.get_calltree()
+    assert actual.address == expected.address
+    assert actual.calldata == expected.calldata
+    assert actual.returndata == expected.returndata
+    assert len(actual.calls) == len(expected.calls)
+    assert [c.address for c in actual.calls] == [c.address for c in expected.calls]
+
+
+def test_state_diff(connected_provider, contract_instance, owner):
+    tx = contract_instance.setNumber(123, sender=owner)
+    trace = connected_provider.get_transaction_trace(tx.txn_hash)
+    post = {k.lower(): v for k, v in trace.state_diff["post"].items()}
+    assert contract_instance.address.lower() in post
+    assert post[contract_instance.address.lower()].get("storage")
@@ -0,0 +1,44 @@
+from ape_foundry.trace_cache import TraceCache
+
+
+def test_get_and_set():
+    cache = TraceCache()
+    assert cache.get("foo") is None
+    cache.set("foo", [{"action": {}}])
+    assert cache.get("foo") == [{"action": {}}]
+
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.entries == 1
+    assert stats.size > 0
+    assert stats.hit_rate == 0.5
+
+
+def test_max_bytes():
+    cache = TraceCache(max_bytes=20)
+    cache.set("a", "x" * 8)
+    cache.set("b", "y" * 8)
+    cache.get("a")  # Now the most recent.
+    cache.set("c", "z" * 8)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 8
+    assert cache.get("c") == "z" * 8
+    assert cache.stats.evictions == 1
+    assert cache.stats.size <= 20
+
+
+def test_spill(tmp_path):
+    cache = TraceCache(max_bytes=20, path=tmp_path / "traces")
+    cache.set("a", "x" * 8)
+    cache.set("b", "y" * 8)
+    cache.set("c", "z" * 8)
+    cache.set("big", "w" * 100)  # Too large for memory.
+    assert cache.get("a") == "x" * 8
+    assert cache.get("big") == "w" * 100
+    assert cache.stats.disk_hits == 2
+
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+    assert not cache.path.exists()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from ape_foundry.exceptions import FoundryProviderError
+from ape_foundry.ws import AnvilWebSocketProvider
+
+
+async def handler(ws, *args):
+    async def respond(request):
+        if request["method"] == "sleep":
+            # Respond to the slower requests last.
+            await asyncio.sleep(request["params"][0])
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": "slept"}))
+
+        elif request["method"] == "eth_subscribe":
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": "0xs1"}))
+            for number in range(3):
+                notification = {
+                    "jsonrpc": "2.0",
+                    "method": "eth_subscription",
+                    "params": {"subscription": "0xs1", "result": {"number": hex(number)}},
+                }
+                await ws.send(json.dumps(notification))
+
+        elif request["method"] == "close":
+            await ws.close()
+
+        else:
+            response = {"jsonrpc": "2.0", "id": request["id"], "result": request["method"]}
+            await ws.send(json.dumps(response))
+
+    async for message in ws:
+        data = json.loads(message)
+        for request in data if isinstance(data, list) else [data]:
+            asyncio.create_task(respond(request))
+
+
+def run_with_server(fn):
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = next(iter(server.sockets)).getsockname()[1]
+            provider = AnvilWebSocketProvider(f"ws://127.0.0.1:{port}", request_timeout=5)
+            try:
+                return await fn(provider)
+            finally:
+                await provider.disconnect()
+
+    return asyncio.run(run())
+
+
+def test_pipelined_requests():
+    async def fn(provider):
+        # All in flight at once, completing in reverse order.
+        return await asyncio.gather(
+            *(provider.make_request("sleep", [0.05 * (5 - idx)]) for idx in range(5)),
+            provider.make_request("eth_chainId", []),
+        )
+
+    responses = run_with_server(fn)
+    assert [r["result"] for r in responses] == [*(["slept"] * 5), "eth_chainId"]
+    assert len({r["id"] for r in responses}) == len(responses)
+
+
+def test_make_batch_request():
+    async def fn(provider):
+        return await provider.make_batch_request([("eth_chainId", []), ("eth_blockNumber", [])])
+
+    assert [r["result"] for r in run_with_server(fn)] == ["eth_chainId", "eth_blockNumber"]
+
+
+def test_subscribe():
+    async def fn(provider):
+        results = []
+        async with await provider.subscribe("newHeads") as subscription:
+            assert subscription.id == "0xs1"
+            async for header in subscription:
+                results.append(header["number"])
+                if len(results) == 3:
+                    break
+
+        assert not provider._subscriptions
+        return results
+
+    assert run_with_server(fn) == ["0x0", "0x1", "0x2"]
+
+
+def test_connection_closed():
+    async def fn(provider):
+        await provider.make_request("close", [])
+
+    with pytest.raises(FoundryProviderError, match="WebSocket connection closed."):
+        run_with_server(fn)
+
+
+def test_request_timeout():
+    async def fn(provider):
+        provider.request_timeout = 0.05
+        with pytest.raises(FoundryProviderError, match="timed out"):
+            await provider.make_request("sleep", [0.2])
+
+        # Not left pending until the connection closes.
+        assert not provider._pending
+
+    run_with_server(fn)
+
+
+def test_connect_failure():
+    async def fn():
+        provider = AnvilWebSocketProvider("ws://127.0.0.1:1")
+        assert not await provider.is_connected()
+
+    asyncio.run(fn())